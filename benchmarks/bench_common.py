@@ -0,0 +1,62 @@
+import contextlib
+import os
+from typing import Any, Dict, Iterator, Optional
+
+import psutil
+
+# Ways the load tester and memory profiler can run their concurrent clients
+CONCURRENCY_MODELS = ("thread", "process")
+
+# CPUs the benchmark pins itself to; fewer on smaller machines
+PINNED_CPU_COUNT = 4
+
+
+@contextlib.contextmanager
+def tuned_scheduling(num_cpus: int = PINNED_CPU_COUNT) -> Iterator[Dict[str, Any]]:
+    # Best effort: pin to a fixed set of CPUs and raise priority so scheduler
+    # migrations and preemption add less jitter. Threads and child processes
+    # started inside the block inherit both settings, and the previous ones
+    # are restored on exit. Yields what was actually applied
+    applied: Dict[str, Any] = {"cpus": None, "nice": None}
+    process = psutil.Process()
+
+    saved_affinity = None
+    if hasattr(os, "sched_setaffinity"):
+        saved_affinity = os.sched_getaffinity(0)
+        cpus = sorted(saved_affinity)[:num_cpus]
+        try:
+            os.sched_setaffinity(0, cpus)
+            applied["cpus"] = cpus
+        except OSError:
+            pass
+
+    saved_nice = process.nice()
+    try:
+        process.nice(psutil.HIGH_PRIORITY_CLASS if os.name == "nt" else -5)
+    except (psutil.AccessDenied, OSError):
+        pass
+    applied["nice"] = process.nice()
+
+    try:
+        yield applied
+    finally:
+        if applied["nice"] != saved_nice:
+            try:
+                process.nice(saved_nice)
+            except (psutil.AccessDenied, OSError):
+                pass
+        if applied["cpus"] is not None:
+            try:
+                os.sched_setaffinity(0, saved_affinity)
+            except OSError:
+                pass
+
+
+def cpu_freq_mhz() -> Optional[float]:
+    # Recorded before and after each test; a large change means frequency
+    # scaling kicked in and the numbers are suspect
+    try:
+        freq = psutil.cpu_freq()
+    except (NotImplementedError, OSError):
+        return None
+    return freq.current if freq else None
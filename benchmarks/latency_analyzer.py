@@ -1,12 +1,14 @@
-import json
+import contextlib
+import functools
 import os
-import statistics
 import sys
 import threading
 import time
-from typing import Any, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import numpy as np
+import orjson
 
 # Add src to path
 sys.path.insert(
@@ -15,15 +17,105 @@ sys.path.insert(
 
 from redis_clone import Client
 
+PERCENTILES = [50, 75, 90, 95, 99, 99.9, 99.99]
+
+# min, median, the reported percentiles and max, resolved from one sort
+_QUANTILES = np.array([0, 50, *PERCENTILES, 100], dtype=np.float64) / 100.0
+
+
+def _summarize(a: np.ndarray) -> Tuple[float, float, np.ndarray, int]:
+    n = a.size
+    ordered = np.sort(a)
+
+    # Linear interpolation between closest ranks, as np.percentile does
+    pos = _QUANTILES * (n - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n - 1)
+    quantiles = ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+    mean = float(ordered.mean())
+    deviations = ordered - mean
+    std_dev = float(np.sqrt(np.dot(deviations, deviations) / (n - 1))) if n > 1 else 0.0
+    outliers = int(np.count_nonzero(np.abs(deviations) > 3 * std_dev))
+
+    return mean, std_dev, quantiles, outliers
+
+
+def _histogram(a: np.ndarray, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Equal-width bins over [min, max] counted with one scaling pass and a
+    # bincount, instead of np.histogram's per-element bin search
+    lo = float(a.min())
+    hi = float(a.max())
+    inv_width = bins / (hi - lo) if hi > lo else 0.0
+    idx = ((a - lo) * inv_width).astype(np.intp)
+    np.minimum(idx, bins - 1, out=idx)  # max lands on the closed last edge
+    return np.bincount(idx, minlength=bins), np.linspace(lo, hi, bins + 1)
+
 
 class LatencyAnalyzer:
-    def __init__(self, host: str = "127.0.0.1", port: int = 31337):
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 31337,
+        client: Optional[Client] = None,
+    ):
         self.host = host
         self.port = port
         self.latency_samples: List[float] = []
+        self._client = client
+        # Keys written by the last SET analysis, reused by the GET analysis
+        self.set_keys: List[str] = []
 
     def create_client(self) -> Client:
-        return Client()
+        return Client(self.host, self.port)
+
+    @property
+    def client(self) -> Client:
+        if self._client is None:
+            self._client = self.create_client()
+        return self._client
+
+    @contextlib.contextmanager
+    def _pinned(self, cpu: Optional[int] = None) -> Iterator[None]:
+        # Pin the calling thread to one CPU and, where permitted, run it
+        # SCHED_FIFO so migrations and preemption stay out of the tail
+        if not hasattr(os, "sched_setaffinity"):
+            yield
+            return
+
+        saved_affinity = os.sched_getaffinity(0)
+        saved_policy = os.sched_getscheduler(0)
+        saved_param = os.sched_getparam(0)
+        if cpu is None:
+            cpu = max(saved_affinity)
+
+        pinned = False
+        try:
+            os.sched_setaffinity(0, {cpu})
+            pinned = True
+        except OSError:
+            pass
+
+        realtime = False
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(50))
+            realtime = True
+        except OSError:
+            pass
+
+        try:
+            yield
+        finally:
+            if realtime:
+                try:
+                    os.sched_setscheduler(0, saved_policy, saved_param)
+                except OSError:
+                    pass
+            if pinned:
+                try:
+                    os.sched_setaffinity(0, saved_affinity)
+                except OSError:
+                    pass
 
     def measure_latency(self, operation_func, *args, **kwargs) -> Tuple[float, Any]:
         start_time = time.perf_counter()
@@ -35,82 +127,120 @@ class LatencyAnalyzer:
     def measure_latency_batch(
         self, operation_func, num_operations: int, *args, **kwargs
     ) -> List[float]:
-        latencies = []
-        for _ in range(num_operations):
-            latency, _ = self.measure_latency(operation_func, *args, **kwargs)
-            latencies.append(latency)
+        if kwargs:
+            operation_func = functools.partial(operation_func, **kwargs)
+
+        pc = time.perf_counter
+        latencies = [0.0] * num_operations
+        for i in range(num_operations):
+            t0 = pc()
+            operation_func(*args)
+            latencies[i] = pc() - t0
         return latencies
 
     def analyze_set_latency(self, num_operations: int = 10000) -> Dict[str, Any]:
         print(f"Analyzing SET latency ({num_operations} operations)...")
 
-        client = self.create_client()
+        client = self.client
         client.flush()  # Clear database
 
-        latencies = []
-        for i in range(num_operations):
-            key = f"latency_test_{i}"
-            value = f"value_{i}"
-            latency, _ = self.measure_latency(client.set, key, value)
-            latencies.append(latency)
+        keys = [f"latency_test_{i}" for i in range(num_operations)]
+        values = [f"value_{i}" for i in range(num_operations)]
+
+        latencies_ns = np.empty(num_operations, dtype=np.int64)
+        pc = time.perf_counter_ns
+        set_fn = client.set
+        with self._pinned():
+            for i in range(num_operations):
+                t0 = pc()
+                set_fn(keys[i], values[i])
+                latencies_ns[i] = pc() - t0
+        self.set_keys = keys
 
-        return self._calculate_latency_stats("SET", latencies)
+        return self._calculate_latency_stats("SET", self._to_seconds(latencies_ns))
+
+    def analyze_get_latency(
+        self, num_operations: int = 10000, keys: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        if keys is not None:
+            # Read back keys that are already populated
+            num_operations = len(keys)
 
-    def analyze_get_latency(self, num_operations: int = 10000) -> Dict[str, Any]:
         print(f"Analyzing GET latency ({num_operations} operations)...")
 
-        client = self.create_client()
-        client.flush()  # Clear database
+        client = self.client
 
-        # Pre-populate with data
-        for i in range(num_operations):
-            client.set(f"latency_test_{i}", f"value_{i}")
+        if keys is None:
+            client.flush()  # Clear database
+            keys = [f"latency_test_{i}" for i in range(num_operations)]
 
-        latencies = []
-        for i in range(num_operations):
-            key = f"latency_test_{i}"
-            latency, _ = self.measure_latency(client.get, key)
-            latencies.append(latency)
+            # Pre-populate with data
+            pipe = client.pipeline()
+            for i, key in enumerate(keys):
+                pipe.set(key, f"value_{i}")
+            pipe.execute()
 
-        return self._calculate_latency_stats("GET", latencies)
+        latencies_ns = np.empty(num_operations, dtype=np.int64)
+        pc = time.perf_counter_ns
+        get_fn = client.get
+        with self._pinned():
+            for i in range(num_operations):
+                t0 = pc()
+                get_fn(keys[i])
+                latencies_ns[i] = pc() - t0
+
+        return self._calculate_latency_stats("GET", self._to_seconds(latencies_ns))
 
     def analyze_ttl_latency(self, num_operations: int = 5000) -> Dict[str, Any]:
         print(f"Analyzing TTL latency ({num_operations} operations)...")
 
-        client = self.create_client()
+        client = self.client
         client.flush()  # Clear database
 
-        # Pre-populate with data
-        for i in range(num_operations):
-            client.set(f"ttl_latency_test_{i}", f"value_{i}")
+        keys = [f"ttl_latency_test_{i}" for i in range(num_operations)]
 
-        latencies = []
-        for i in range(num_operations):
-            key = f"ttl_latency_test_{i}"
-            latency, _ = self.measure_latency(client.execute, "EXPIRE", key, 60)
-            latencies.append(latency)
-
-        return self._calculate_latency_stats("TTL", latencies)
+        # Pre-populate with data
+        pipe = client.pipeline()
+        for i, key in enumerate(keys):
+            pipe.set(key, f"value_{i}")
+        pipe.execute()
+
+        latencies_ns = np.empty(num_operations, dtype=np.int64)
+        pc = time.perf_counter_ns
+        execute = client.execute
+        with self._pinned():
+            for i in range(num_operations):
+                t0 = pc()
+                execute("EXPIRE", keys[i], 60)
+                latencies_ns[i] = pc() - t0
+
+        return self._calculate_latency_stats("TTL", self._to_seconds(latencies_ns))
 
     def analyze_mixed_latency(self, num_operations: int = 10000) -> Dict[str, Any]:
         print(f"Analyzing mixed operation latency ({num_operations} operations)...")
 
-        client = self.create_client()
+        client = self.client
         client.flush()  # Clear database
 
-        latencies = []
-        for i in range(num_operations):
-            key = f"mixed_latency_test_{i}"
-            value = f"value_{i}"
-
-            # Alternate between SET and GET
-            if i % 2 == 0:
-                latency, _ = self.measure_latency(client.set, key, value)
-            else:
-                latency, _ = self.measure_latency(client.get, key)
-            latencies.append(latency)
-
-        return self._calculate_latency_stats("MIXED", latencies)
+        keys = [f"mixed_latency_test_{i}" for i in range(num_operations)]
+        values = [f"value_{i}" for i in range(num_operations)]
+
+        latencies_ns = np.empty(num_operations, dtype=np.int64)
+        pc = time.perf_counter_ns
+        set_fn = client.set
+        get_fn = client.get
+        with self._pinned():
+            for i in range(num_operations):
+                # Alternate between SET and GET
+                if i % 2 == 0:
+                    t0 = pc()
+                    set_fn(keys[i], values[i])
+                else:
+                    t0 = pc()
+                    get_fn(keys[i])
+                latencies_ns[i] = pc() - t0
+
+        return self._calculate_latency_stats("MIXED", self._to_seconds(latencies_ns))
 
     def analyze_latency_under_load(
         self, num_clients: int = 10, operations_per_client: int = 1000
@@ -119,48 +249,64 @@ class LatencyAnalyzer:
             f"Analyzing latency under load ({num_clients} clients, {operations_per_client} ops each)..."
         )
 
-        all_latencies = []
-        client_results = []
-
-        def client_worker(client_id: int):
-            client = self.create_client()
-            client.flush()  # Clear database
-
-            latencies = []
-            for i in range(operations_per_client):
-                key = f"load_latency_{client_id}_{i}"
-                value = f"value_{client_id}_{i}"
-                latency, _ = self.measure_latency(client.set, key, value)
-                latencies.append(latency)
-
-            client_results.append(
-                {
-                    "client_id": client_id,
-                    "latencies": latencies,
-                    "avg_latency_ms": statistics.mean(latencies) * 1000,
-                    "min_latency_ms": min(latencies) * 1000,
-                    "max_latency_ms": max(latencies) * 1000,
-                }
-            )
-
-            all_latencies.extend(latencies)
+        # Workers connect and warm up first, then wait here with the driver
+        # so connection setup stays out of the measured latencies
+        ready = threading.Barrier(num_clients + 1)
 
-        # Run concurrent clients
-        threads = []
-        start_time = time.perf_counter()
-
-        for client_id in range(num_clients):
-            thread = threading.Thread(target=client_worker, args=(client_id,))
-            threads.append(thread)
-            thread.start()
-
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
+        def client_worker(client_id: int) -> np.ndarray:
+            # gevent sockets belong to the thread that created them, so each
+            # worker opens its own connection
+            try:
+                client = self.create_client()
+                client.get("__warmup__")
+            except BaseException:
+                ready.abort()  # Don't leave the driver waiting on the barrier
+                raise
+
+            keys = [
+                f"load_latency_{client_id}_{i}" for i in range(operations_per_client)
+            ]
+            values = [f"value_{client_id}_{i}" for i in range(operations_per_client)]
+
+            latencies_ns = np.empty(operations_per_client, dtype=np.int64)
+            pc = time.perf_counter_ns
+            set_fn = client.set
+            ready.wait()
+            with self._pinned(client_id % (os.cpu_count() or 1)):
+                for i in range(operations_per_client):
+                    t0 = pc()
+                    set_fn(keys[i], values[i])
+                    latencies_ns[i] = pc() - t0
+            return self._to_seconds(latencies_ns)
+
+        self.client.flush()  # Clear database once, before any worker starts
+
+        with ThreadPoolExecutor(max_workers=num_clients) as executor:
+            futures = [
+                executor.submit(client_worker, client_id)
+                for client_id in range(num_clients)
+            ]
+
+            # Run concurrent clients
+            ready.wait()
+            start_time = time.perf_counter()
+            per_client = [future.result() for future in futures]
 
         end_time = time.perf_counter()
         total_time = end_time - start_time
 
+        client_results = [
+            {
+                "client_id": client_id,
+                "latencies": latencies.tolist(),
+                "avg_latency_ms": float(latencies.mean()) * 1000,
+                "min_latency_ms": float(latencies.min()) * 1000,
+                "max_latency_ms": float(latencies.max()) * 1000,
+            }
+            for client_id, latencies in enumerate(per_client)
+        ]
+        all_latencies = np.concatenate(per_client)
+
         # Calculate overall statistics
         overall_stats = self._calculate_latency_stats("LOAD", all_latencies)
         overall_stats["total_time"] = total_time
@@ -173,37 +319,44 @@ class LatencyAnalyzer:
     ) -> Dict[str, Any]:
         print(f"Analyzing latency distribution ({num_operations} operations)...")
 
-        client = self.create_client()
+        client = self.client
         client.flush()  # Clear database
 
-        latencies = []
-        for i in range(num_operations):
-            key = f"dist_latency_test_{i}"
-            value = f"value_{i}"
-            latency, _ = self.measure_latency(client.set, key, value)
-            latencies.append(latency)
+        keys = [f"dist_latency_test_{i}" for i in range(num_operations)]
+        values = [f"value_{i}" for i in range(num_operations)]
+
+        latencies_ns = np.empty(num_operations, dtype=np.int64)
+        pc = time.perf_counter_ns
+        set_fn = client.set
+        with self._pinned():
+            for i in range(num_operations):
+                t0 = pc()
+                set_fn(keys[i], values[i])
+                latencies_ns[i] = pc() - t0
+        latencies = self._to_seconds(latencies_ns)
 
         # Calculate distribution statistics
-        latencies_ms = [
-            latency * 1000 for latency in latencies
-        ]  # Convert to milliseconds
+        latencies_ms = latencies * 1000.0  # Convert to milliseconds
 
         # Create histogram data
         histogram_bins = 20
-        hist, bin_edges = np.histogram(latencies_ms, bins=histogram_bins)
+        hist, bin_edges = _histogram(latencies_ms, histogram_bins)
 
         # Calculate percentiles
-        percentiles = {}
-        for p in [50, 75, 90, 95, 99, 99.9, 99.99]:
-            percentiles[f"p{p}"] = np.percentile(latencies_ms, p)
+        percentiles = dict(
+            zip(
+                (f"p{p}" for p in PERCENTILES),
+                np.percentile(latencies_ms, PERCENTILES).tolist(),
+            )
+        )
 
         return {
             "operation": "DISTRIBUTION",
             "num_operations": num_operations,
-            "latencies_ms": latencies_ms,
+            "latencies_ms": latencies_ms.tolist(),
             "histogram": {
-                "bins": bin_edges.tolist(),
-                "counts": hist.tolist(),
+                "bins": bin_edges,
+                "counts": hist,
             },
             "percentiles": percentiles,
             "statistics": self._calculate_latency_stats("DISTRIBUTION", latencies),
@@ -216,27 +369,37 @@ class LatencyAnalyzer:
             f"Analyzing latency trends ({num_operations} operations, sampling every {sample_interval})..."
         )
 
-        client = self.create_client()
+        client = self.client
         client.flush()  # Clear database
 
-        latencies = []
-        samples = []
+        keys = [f"trend_latency_test_{i}" for i in range(num_operations)]
+        values = [f"value_{i}" for i in range(num_operations)]
 
-        for i in range(num_operations):
-            key = f"trend_latency_test_{i}"
-            value = f"value_{i}"
-            latency, _ = self.measure_latency(client.set, key, value)
-            latencies.append(latency)
-
-            # Sample at intervals
-            if i % sample_interval == 0:
-                samples.append(
-                    {
-                        "operation": i,
-                        "latency_ms": latency * 1000,
-                        "cumulative_avg_ms": statistics.mean(latencies) * 1000,
-                    }
-                )
+        latencies_ns = np.empty(num_operations, dtype=np.int64)
+        samples = []
+        pc = time.perf_counter_ns
+        set_fn = client.set
+        total_ns = 0
+
+        with self._pinned():
+            for i in range(num_operations):
+                t0 = pc()
+                set_fn(keys[i], values[i])
+                latency_ns = pc() - t0
+                latencies_ns[i] = latency_ns
+                total_ns += latency_ns
+
+                # Sample at intervals
+                if i % sample_interval == 0:
+                    samples.append(
+                        {
+                            "operation": i,
+                            "latency_ms": latency_ns / 1e6,
+                            "cumulative_avg_ms": total_ns / (i + 1) / 1e6,
+                        }
+                    )
+
+        latencies = self._to_seconds(latencies_ns)
 
         return {
             "operation": "TRENDS",
@@ -249,7 +412,7 @@ class LatencyAnalyzer:
     def analyze_latency_with_different_value_sizes(self) -> Dict[str, Any]:
         print("Analyzing latency with different value sizes...")
 
-        client = self.create_client()
+        client = self.client
         client.flush()  # Clear database
 
         value_sizes = [1, 10, 100, 1000, 10000]  # KB
@@ -259,14 +422,20 @@ class LatencyAnalyzer:
             print(f"  Testing {size_kb}KB values...")
             value = "x" * (size_kb * 1024)
 
-            latencies = []
-            for i in range(1000):  # 1000 operations per size
-                key = f"size_test_{size_kb}kb_{i}"
-                latency, _ = self.measure_latency(client.set, key, value)
-                latencies.append(latency)
+            num_operations = 1000  # 1000 operations per size
+            keys = [f"size_test_{size_kb}kb_{i}" for i in range(num_operations)]
+
+            latencies_ns = np.empty(num_operations, dtype=np.int64)
+            pc = time.perf_counter_ns
+            set_fn = client.set
+            with self._pinned():
+                for i in range(num_operations):
+                    t0 = pc()
+                    set_fn(keys[i], value)
+                    latencies_ns[i] = pc() - t0
 
             results[f"{size_kb}KB"] = self._calculate_latency_stats(
-                f"SET_{size_kb}KB", latencies
+                f"SET_{size_kb}KB", self._to_seconds(latencies_ns)
             )
 
         return {
@@ -274,50 +443,44 @@ class LatencyAnalyzer:
             "results": results,
         }
 
+    def _to_seconds(self, latencies_ns: np.ndarray) -> np.ndarray:
+        return latencies_ns * 1e-9
+
     def _calculate_latency_stats(
-        self, operation: str, latencies: List[float]
+        self, operation: str, latencies: Sequence[float]
     ) -> Dict[str, Any]:
-        if not latencies:
+        if len(latencies) == 0:
             return {"operation": operation, "error": "No latency data"}
 
-        latencies_ms = [
-            latency * 1000 for latency in latencies
-        ]  # Convert to milliseconds
+        a = np.asarray(latencies, dtype=np.float64) * 1000.0  # Convert to milliseconds
+        n = a.size
+        mean, std_dev, quantiles, outliers = _summarize(a)
+        min_ms = float(quantiles[0])
+        max_ms = float(quantiles[-1])
 
         # Basic statistics
         stats = {
             "operation": operation,
-            "num_samples": len(latencies),
-            "avg_latency_ms": statistics.mean(latencies_ms),
-            "median_latency_ms": statistics.median(latencies_ms),
-            "min_latency_ms": min(latencies_ms),
-            "max_latency_ms": max(latencies_ms),
-            "std_dev_ms": statistics.stdev(latencies_ms)
-            if len(latencies_ms) > 1
-            else 0,
+            "num_samples": n,
+            "avg_latency_ms": mean,
+            "median_latency_ms": float(quantiles[1]),
+            "min_latency_ms": min_ms,
+            "max_latency_ms": max_ms,
+            "std_dev_ms": std_dev,
         }
 
         # Percentiles
-        percentiles = {}
-        for p in [50, 75, 90, 95, 99, 99.9, 99.99]:
-            percentiles[f"p{p}"] = np.percentile(latencies_ms, p)
-
-        stats["percentiles"] = percentiles
+        stats["percentiles"] = dict(
+            zip((f"p{p}" for p in PERCENTILES), quantiles[2:-1].tolist())
+        )
 
         # Additional statistics
-        stats["variance_ms"] = (
-            statistics.variance(latencies_ms) if len(latencies_ms) > 1 else 0
-        )
-        stats["range_ms"] = max(latencies_ms) - min(latencies_ms)
+        stats["variance_ms"] = std_dev * std_dev
+        stats["range_ms"] = max_ms - min_ms
 
         # Outlier detection (values beyond 3 standard deviations)
-        mean = statistics.mean(latencies_ms)
-        std_dev = statistics.stdev(latencies_ms) if len(latencies_ms) > 1 else 0
-        outliers = [
-            latency for latency in latencies_ms if abs(latency - mean) > 3 * std_dev
-        ]
-        stats["outliers_count"] = len(outliers)
-        stats["outlier_percentage"] = (len(outliers) / len(latencies_ms)) * 100
+        stats["outliers_count"] = outliers
+        stats["outlier_percentage"] = (outliers / n) * 100
 
         return stats
 
@@ -331,7 +494,10 @@ class LatencyAnalyzer:
         # Run all latency analyses
         analyses = [
             ("SET Latency", lambda: self.analyze_set_latency(10000)),
-            ("GET Latency", lambda: self.analyze_get_latency(10000)),
+            (
+                "GET Latency",
+                lambda: self.analyze_get_latency(10000, keys=self.set_keys or None),
+            ),
             ("TTL Latency", lambda: self.analyze_ttl_latency(5000)),
             ("Mixed Latency", lambda: self.analyze_mixed_latency(10000)),
             ("Load Latency", lambda: self.analyze_latency_under_load(10, 1000)),
@@ -399,8 +565,12 @@ def main():
     results_dir = "results"
     os.makedirs(results_dir, exist_ok=True)
 
-    with open(os.path.join(results_dir, "latency_analysis_results.json"), "w") as f:
-        json.dump(results, f, indent=2)
+    with open(os.path.join(results_dir, "latency_analysis_results.json"), "wb") as f:
+        f.write(
+            orjson.dumps(
+                results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            )
+        )
     print(f"Results saved to {results_dir}/latency_analysis_results.json")
 
 
@@ -1,60 +1,229 @@
-import json
+import argparse
+import array
+import contextlib
 import os
-import statistics
 import sys
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Dict, List
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
 
 # Add src to path
 sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
 )
 
+from bench_common import CONCURRENCY_MODELS, cpu_freq_mhz, tuned_scheduling
+
 from redis_clone import Client
 
 
+def _timer_overhead_ns(samples: int = 10000) -> int:
+    # Median cost of back-to-back perf_counter_ns() calls; latencies within a
+    # few multiples of it are mostly timer quantization, not operation time
+    deltas = np.empty(samples, dtype=np.int64)
+    pc = time.perf_counter_ns
+    for i in range(samples):
+        t0 = pc()
+        deltas[i] = pc() - t0
+    return int(np.median(deltas))
+
+
+def _pack_keys(prefix: str, worker_id: int, num_operations: int) -> List[bytes]:
+    # Builds a worker's keys or values as "<prefix>_<worker_id>_<i>" bytes
+    # before its timed loop. The shared head is encoded once and only the
+    # index is formatted per item, straight to bytes
+    head = b"%s_%d_" % (prefix.encode(), worker_id)
+    return [head + b"%d" % i for i in range(num_operations)]
+
+
+def _worker_latency_ms(latencies_ns: array.array) -> Dict[str, float]:
+    # Latencies are kept as integer nanoseconds; convert to ms only here
+    if not latencies_ns:
+        return {"avg_latency_ms": 0, "min_latency_ms": 0, "max_latency_ms": 0}
+    return {
+        "avg_latency_ms": sum(latencies_ns) / len(latencies_ns) / 1e6,
+        "min_latency_ms": min(latencies_ns) / 1e6,
+        "max_latency_ms": max(latencies_ns) / 1e6,
+    }
+
+
+def _sustained_worker(
+    host: str, port: int, worker_id: int, duration_seconds: float
+) -> Dict[str, Any]:
+    # Module level so a process pool can pickle it; the client is built here
+    # because connections cannot cross threads or processes
+    client = Client(host, port)
+    operation_count = 0
+    error_count = 0
+
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < duration_seconds:
+        try:
+            key = f"sustained_{worker_id}_{operation_count}"
+            value = f"value_{worker_id}_{operation_count}"
+
+            if client.set(key, value) != 1:
+                error_count += 1
+
+            operation_count += 1
+
+        except Exception as e:
+            error_count += 1
+            print(f"Sustained worker {worker_id} error: {e}")
+
+    return {
+        "worker_id": worker_id,
+        "operations": operation_count,
+        "errors": error_count,
+    }
+
+
 class LoadTester:
-    def __init__(self, host: str = "127.0.0.1", port: int = 31337):
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 31337,
+        sample_rate: int = 64,
+        use_pipeline: bool = False,
+        pipeline_batch_size: int = 128,
+        concurrency_model: str = "thread",
+        scheduling: Optional[Dict[str, Any]] = None,
+    ):
+        if concurrency_model not in CONCURRENCY_MODELS:
+            raise ValueError(f"Unknown concurrency model: {concurrency_model}")
+        if sample_rate < 1 or sample_rate & (sample_rate - 1):
+            raise ValueError(f"sample_rate must be a power of two: {sample_rate}")
+
         self.host = host
         self.port = port
+        # Only every sample_rate-th operation is timed, so the timer calls
+        # don't dominate the cost of fast operations
+        self.sample_rate = sample_rate
+        # Pipelined mode trades per-op latency for throughput: commands go out
+        # in batches and each batch's time is spread over its operations
+        self.use_pipeline = use_pipeline
+        self.pipeline_batch_size = pipeline_batch_size
+        # Threads share one GIL; "process" runs the sustained test's clients
+        # in separate interpreters so client-side work can use every core
+        self.concurrency_model = concurrency_model
         self.results: List[Dict[str, Any]] = []
+        # What tuned_scheduling() applied, if the run is inside it
+        self.scheduling = scheduling
+        # Samples below timer_threshold_ns are excluded from latency stats
+        self.timer_overhead_ns = _timer_overhead_ns()
+        self.timer_threshold_ns = 3 * self.timer_overhead_ns
+        # Each executor thread keeps one connection for its whole lifetime
+        self._tls = threading.local()
 
     def create_client(self) -> Client:
-        return Client()
+        return Client(self.host, self.port)
+
+    def _init_tls_client(self) -> None:
+        self._tls.client = self.create_client()
+
+    def get_client(self) -> Client:
+        client = getattr(self._tls, "client", None)
+        if client is None:
+            client = self._tls.client = self.create_client()
+        return client
+
+    def _run_pipelined(
+        self, client: Client, commands: List[Tuple[Any, ...]]
+    ) -> Tuple[int, int, array.array]:
+        success_count = 0
+        error_count = 0
+        latencies = array.array("q")
+        batch_size = self.pipeline_batch_size
+        pipe = client.pipeline()
+
+        for start in range(0, len(commands), batch_size):
+            batch = commands[start : start + batch_size]
+            for command in batch:
+                pipe.execute_command(*command)
+
+            try:
+                op_start = time.perf_counter_ns()
+                results = pipe.execute()
+                op_end = time.perf_counter_ns()
+            except Exception as e:
+                error_count += len(batch)
+                print(f"Pipeline error: {e}")
+                continue
+
+            # SET replies 1 and GET the value; errors come back as a list
+            ok = sum(1 for r in results if r is not None and not isinstance(r, list))
+            success_count += ok
+            error_count += len(batch) - ok
+            latencies.append((op_end - op_start) // len(batch))
+
+        return success_count, error_count, latencies
 
     def worker_set_operations(
         self, worker_id: int, num_operations: int
     ) -> Dict[str, Any]:
-        client = self.create_client()
-        client.flush()  # Clear database
+        client = self.get_client()
+
+        pairs = list(
+            zip(
+                _pack_keys("load_test", worker_id, num_operations),
+                _pack_keys("value", worker_id, num_operations),
+            )
+        )
+        set_fn = client.set
+
+        if self.use_pipeline:
+            commands = [("SET", key, value) for key, value in pairs]
 
         start_time = time.perf_counter()
-        success_count = 0
-        error_count = 0
-        latencies = []
+        if self.use_pipeline:
+            success_count, error_count, latencies = self._run_pipelined(
+                client, commands
+            )
+            sampled_count = len(latencies)
+        else:
+            success_count = 0
+            error_count = 0
+            mask = self.sample_rate - 1
+            latencies = array.array(
+                "q", bytes(8 * ((num_operations + mask) // (mask + 1)))
+            )
+            sampled_count = 0
 
-        for i in range(num_operations):
-            try:
-                key = f"load_test_{worker_id}_{i}"
-                value = f"value_{worker_id}_{i}"
+            for i in range(num_operations):
+                try:
+                    key, value = pairs[i]
 
-                op_start = time.perf_counter()
-                result = client.set(key, value)
-                op_end = time.perf_counter()
+                    sampled = not i & mask
+                    if sampled:
+                        op_start = time.perf_counter_ns()
+                    result = set_fn(key, value)
+                    if sampled:
+                        op_end = time.perf_counter_ns()
 
-                if result == 1:
-                    success_count += 1
-                    latencies.append(op_end - op_start)
-                else:
-                    error_count += 1
+                    if result == 1:
+                        success_count += 1
+                        if sampled:
+                            latencies[sampled_count] = op_end - op_start
+                            sampled_count += 1
+                    else:
+                        error_count += 1
 
-            except Exception as e:
-                error_count += 1
-                print(f"Worker {worker_id} error: {e}")
+                except Exception as e:
+                    error_count += 1
+                    print(f"Worker {worker_id} error: {e}")
 
         end_time = time.perf_counter()
         total_time = end_time - start_time
+        latencies = latencies[:sampled_count]
 
         return {
             "worker_id": worker_id,
@@ -64,46 +233,71 @@ class LoadTester:
             "error_count": error_count,
             "total_time": total_time,
             "ops_per_second": num_operations / total_time,
-            "avg_latency_ms": statistics.mean(latencies) * 1000 if latencies else 0,
-            "min_latency_ms": min(latencies) * 1000 if latencies else 0,
-            "max_latency_ms": max(latencies) * 1000 if latencies else 0,
+            "pipelined": self.use_pipeline,
+            "latency_sample_rate": self.sample_rate,
+            "sampled_operations": sampled_count,
+            **_worker_latency_ms(latencies),
+            "latencies_ns": latencies,
         }
 
     def worker_get_operations(
         self, worker_id: int, num_operations: int
     ) -> Dict[str, Any]:
-        client = self.create_client()
-        client.flush()  # Clear database
+        client = self.get_client()
+
+        keys = _pack_keys("load_test", worker_id, num_operations)
+        get_fn = client.get
 
         # Pre-populate with data
-        for i in range(num_operations):
-            client.set(f"load_test_{worker_id}_{i}", f"value_{worker_id}_{i}")
+        pipe = client.pipeline()
+        for key, value in zip(keys, _pack_keys("value", worker_id, num_operations)):
+            pipe.set(key, value)
+        pipe.execute()
 
-        start_time = time.perf_counter()
-        success_count = 0
-        error_count = 0
-        latencies = []
+        if self.use_pipeline:
+            commands = [("GET", key) for key in keys]
 
-        for i in range(num_operations):
-            try:
-                key = f"load_test_{worker_id}_{i}"
+        start_time = time.perf_counter()
+        if self.use_pipeline:
+            success_count, error_count, latencies = self._run_pipelined(
+                client, commands
+            )
+            sampled_count = len(latencies)
+        else:
+            success_count = 0
+            error_count = 0
+            mask = self.sample_rate - 1
+            latencies = array.array(
+                "q", bytes(8 * ((num_operations + mask) // (mask + 1)))
+            )
+            sampled_count = 0
 
-                op_start = time.perf_counter()
-                result = client.get(key)
-                op_end = time.perf_counter()
+            for i in range(num_operations):
+                try:
+                    key = keys[i]
+
+                    sampled = not i & mask
+                    if sampled:
+                        op_start = time.perf_counter_ns()
+                    result = get_fn(key)
+                    if sampled:
+                        op_end = time.perf_counter_ns()
+
+                    if result is not None:
+                        success_count += 1
+                        if sampled:
+                            latencies[sampled_count] = op_end - op_start
+                            sampled_count += 1
+                    else:
+                        error_count += 1
 
-                if result is not None:
-                    success_count += 1
-                    latencies.append(op_end - op_start)
-                else:
+                except Exception as e:
                     error_count += 1
-
-            except Exception as e:
-                error_count += 1
-                print(f"Worker {worker_id} error: {e}")
+                    print(f"Worker {worker_id} error: {e}")
 
         end_time = time.perf_counter()
         total_time = end_time - start_time
+        latencies = latencies[:sampled_count]
 
         return {
             "worker_id": worker_id,
@@ -113,51 +307,109 @@ class LoadTester:
             "error_count": error_count,
             "total_time": total_time,
             "ops_per_second": num_operations / total_time,
-            "avg_latency_ms": statistics.mean(latencies) * 1000 if latencies else 0,
-            "min_latency_ms": min(latencies) * 1000 if latencies else 0,
-            "max_latency_ms": max(latencies) * 1000 if latencies else 0,
+            "pipelined": self.use_pipeline,
+            "latency_sample_rate": self.sample_rate,
+            "sampled_operations": sampled_count,
+            **_worker_latency_ms(latencies),
+            "latencies_ns": latencies,
         }
 
     def worker_mixed_operations(
         self, worker_id: int, num_operations: int
     ) -> Dict[str, Any]:
-        client = self.create_client()
-        client.flush()  # Clear database
+        client = self.get_client()
+
+        # Each SET is followed by a GET of the same key, so every GET hits;
+        # an odd trailing operation is a lone SET
+        num_pairs = (num_operations + 1) // 2
+        pairs = list(
+            zip(
+                _pack_keys("mixed_test", worker_id, num_pairs),
+                _pack_keys("value", worker_id, num_pairs),
+            )
+        )
+        set_fn = client.set
+        get_fn = client.get
+
+        if self.use_pipeline:
+            commands = []
+            for key, value in pairs:
+                commands.append(("SET", key, value))
+                commands.append(("GET", key))
+            del commands[num_operations:]
 
         start_time = time.perf_counter()
-        success_count = 0
-        error_count = 0
-        latencies = []
+        if self.use_pipeline:
+            success_count, error_count, latencies = self._run_pipelined(
+                client, commands
+            )
+            sampled_count = len(latencies)
+        else:
+            success_count = 0
+            error_count = 0
+            # Sample SET/GET pairs so both operation types are timed
+            mask = self.sample_rate - 1
+            latencies = array.array("q", bytes(16 * ((num_pairs + mask) // (mask + 1))))
+            sampled_count = 0
+            full_pairs = num_operations // 2
+
+            # Unrolled: one SET and one GET per iteration, no per-op branch on
+            # the operation type
+            for i in range(full_pairs):
+                key, value = pairs[i]
+                sampled = not i & mask
 
-        for i in range(num_operations):
-            try:
-                key = f"mixed_test_{worker_id}_{i}"
-                value = f"value_{worker_id}_{i}"
+                try:
+                    if sampled:
+                        op_start = time.perf_counter_ns()
+                    result = set_fn(key, value)
+                    if sampled:
+                        op_end = time.perf_counter_ns()
 
-                op_start = time.perf_counter()
+                    if result == 1:
+                        success_count += 1
+                        if sampled:
+                            latencies[sampled_count] = op_end - op_start
+                            sampled_count += 1
+                    else:
+                        error_count += 1
 
-                # Alternate between SET and GET
-                if i % 2 == 0:
-                    result = client.set(key, value)
-                    expected_success = result == 1
-                else:
-                    result = client.get(key)
-                    expected_success = result is not None
+                except Exception as e:
+                    error_count += 1
+                    print(f"Worker {worker_id} error: {e}")
 
-                op_end = time.perf_counter()
+                try:
+                    if sampled:
+                        op_start = time.perf_counter_ns()
+                    result = get_fn(key)
+                    if sampled:
+                        op_end = time.perf_counter_ns()
+
+                    if result is not None:
+                        success_count += 1
+                        if sampled:
+                            latencies[sampled_count] = op_end - op_start
+                            sampled_count += 1
+                    else:
+                        error_count += 1
 
-                if expected_success:
-                    success_count += 1
-                    latencies.append(op_end - op_start)
-                else:
+                except Exception as e:
                     error_count += 1
+                    print(f"Worker {worker_id} error: {e}")
 
-            except Exception as e:
-                error_count += 1
-                print(f"Worker {worker_id} error: {e}")
+            if full_pairs < num_pairs:
+                try:
+                    if set_fn(*pairs[full_pairs]) == 1:
+                        success_count += 1
+                    else:
+                        error_count += 1
+                except Exception as e:
+                    error_count += 1
+                    print(f"Worker {worker_id} error: {e}")
 
         end_time = time.perf_counter()
         total_time = end_time - start_time
+        latencies = latencies[:sampled_count]
 
         return {
             "worker_id": worker_id,
@@ -167,9 +419,11 @@ class LoadTester:
             "error_count": error_count,
             "total_time": total_time,
             "ops_per_second": num_operations / total_time,
-            "avg_latency_ms": statistics.mean(latencies) * 1000 if latencies else 0,
-            "min_latency_ms": min(latencies) * 1000 if latencies else 0,
-            "max_latency_ms": max(latencies) * 1000 if latencies else 0,
+            "pipelined": self.use_pipeline,
+            "latency_sample_rate": self.sample_rate,
+            "sampled_operations": sampled_count,
+            **_worker_latency_ms(latencies),
+            "latencies_ns": latencies,
         }
 
     def run_load_test(
@@ -191,46 +445,66 @@ class LoadTester:
 
         worker_func = worker_functions[operation_type]
 
-        # Run load test
-        start_time = time.perf_counter()
+        # Clear the database once for the whole run instead of once per
+        # worker, where one worker's flush could wipe another's keys
+        self.create_client().flush()
+
         results = []
 
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        with ThreadPoolExecutor(
+            max_workers=num_workers, initializer=self._init_tls_client
+        ) as executor:
+            # Spin up every worker thread, and with it its connection, before
+            # the clock starts; the barrier keeps each task on its own thread
+            ready = threading.Barrier(num_workers)
+            for future in [executor.submit(ready.wait, 30) for _ in range(num_workers)]:
+                future.result()
+
+            # Run load test
+            freq_before = cpu_freq_mhz()
+            start_time = time.perf_counter()
+
             # Submit all worker tasks
             futures = [
                 executor.submit(worker_func, worker_id, operations_per_worker)
                 for worker_id in range(num_workers)
             ]
 
-            # Collect results as they complete
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    print(f"Worker failed: {e}")
+            # Block once for every worker instead of waking per completion
+            wait(futures)
+
+            end_time = time.perf_counter()
+            freq_after = cpu_freq_mhz()
+
+        # Collect results in worker_id order
+        for future in futures:
+            try:
+                result = future.result()
+                results.append(result)
+            except Exception as e:
+                print(f"Worker failed: {e}")
 
-        end_time = time.perf_counter()
         total_time = end_time - start_time
 
-        # Aggregate results
-        total_operations = sum(r["total_operations"] for r in results)
-        total_success = sum(r["success_count"] for r in results)
-        total_errors = sum(r["error_count"] for r in results)
-
-        # Calculate aggregate latency stats from worker results
-        all_avg_latencies = []
-        all_min_latencies = []
-        all_max_latencies = []
-        for result in results:
-            if "avg_latency_ms" in result:
-                all_avg_latencies.append(
-                    result["avg_latency_ms"] / 1000
-                )  # Convert back to seconds
-            if "min_latency_ms" in result:
-                all_min_latencies.append(result["min_latency_ms"] / 1000)
-            if "max_latency_ms" in result:
-                all_max_latencies.append(result["max_latency_ms"] / 1000)
+        # Aggregate results in a single pass. Tail percentiles need the raw
+        # samples, not per-worker means; the samples are dropped from the
+        # worker payloads so they stay out of the saved results
+        total_operations = 0
+        total_success = 0
+        total_errors = 0
+        all_latencies_ns = []
+        for r in results:
+            total_operations += r["total_operations"]
+            total_success += r["success_count"]
+            total_errors += r["error_count"]
+            all_latencies_ns.append(
+                np.frombuffer(r.pop("latencies_ns"), dtype=np.int64)
+            )
+        all_latencies_ns = (
+            np.concatenate(all_latencies_ns)
+            if all_latencies_ns
+            else np.empty(0, dtype=np.int64)
+        )
 
         return {
             "test_config": {
@@ -238,6 +512,8 @@ class LoadTester:
                 "operations_per_worker": operations_per_worker,
                 "operation_type": operation_type,
                 "total_operations": total_operations,
+                "scheduling": self.scheduling,
+                "cpu_freq_mhz": {"before": freq_before, "after": freq_after},
             },
             "performance": {
                 "total_time": total_time,
@@ -249,38 +525,50 @@ class LoadTester:
                 if total_operations > 0
                 else 0,
             },
-            "latency_stats": {
-                "avg_latency_ms": statistics.mean(all_avg_latencies) * 1000
-                if all_avg_latencies
-                else 0,
-                "min_latency_ms": min(all_min_latencies) * 1000
-                if all_min_latencies
-                else 0,
-                "max_latency_ms": max(all_max_latencies) * 1000
-                if all_max_latencies
-                else 0,
-                "median_latency_ms": statistics.median(all_avg_latencies) * 1000
-                if all_avg_latencies
-                else 0,
-                "p95_latency_ms": self._percentile(all_avg_latencies, 95) * 1000
-                if all_avg_latencies
-                else 0,
-                "p99_latency_ms": self._percentile(all_avg_latencies, 99) * 1000
-                if all_avg_latencies
-                else 0,
-                "std_dev_ms": statistics.stdev(all_avg_latencies) * 1000
-                if len(all_avg_latencies) > 1
-                else 0,
-            },
+            "latency_stats": self._latency_stats(all_latencies_ns),
             "worker_results": results,
         }
 
-    def _percentile(self, data: List[float], percentile: int) -> float:
-        if not data:
-            return 0
-        sorted_data = sorted(data)
-        index = int(len(sorted_data) * percentile / 100)
-        return sorted_data[min(index, len(sorted_data) - 1)]
+    def _latency_stats(self, latencies_ns: np.ndarray) -> Dict[str, float]:
+        below_threshold = latencies_ns < self.timer_threshold_ns
+        timer_stats = {
+            "timer_overhead_ns": self.timer_overhead_ns,
+            "below_threshold_fraction": float(below_threshold.mean())
+            if len(latencies_ns)
+            else 0,
+        }
+        latencies_ns = latencies_ns[~below_threshold]
+
+        if not len(latencies_ns):
+            return {
+                "avg_latency_ms": 0,
+                "min_latency_ms": 0,
+                "max_latency_ms": 0,
+                "median_latency_ms": 0,
+                "p95_latency_ms": 0,
+                "p99_latency_ms": 0,
+                "std_dev_ms": 0,
+                **timer_stats,
+            }
+
+        # One array, one partition for every quantile
+        latencies_ms = latencies_ns / 1e6
+        min_ms, median, p95, p99, max_ms = np.quantile(
+            latencies_ms, [0, 0.5, 0.95, 0.99, 1]
+        ).tolist()
+
+        return {
+            "avg_latency_ms": float(latencies_ms.mean()),
+            "min_latency_ms": min_ms,
+            "max_latency_ms": max_ms,
+            "median_latency_ms": median,
+            "p95_latency_ms": p95,
+            "p99_latency_ms": p99,
+            "std_dev_ms": float(latencies_ms.std(ddof=1))
+            if len(latencies_ms) > 1
+            else 0,
+            **timer_stats,
+        }
 
     def run_scaling_test(self) -> Dict[str, Any]:
         print("Running scaling test...")
@@ -305,6 +593,11 @@ class LoadTester:
 
         return scaling_results
 
+    def _sustained_executor(self, num_workers: int) -> Executor:
+        if self.concurrency_model == "process":
+            return ProcessPoolExecutor(max_workers=num_workers)
+        return ThreadPoolExecutor(max_workers=num_workers)
+
     def run_sustained_load_test(
         self, duration_seconds: int = 60, num_workers: int = 10
     ) -> Dict[str, Any]:
@@ -313,55 +606,33 @@ class LoadTester:
         )
 
         results = []
+        freq_before = cpu_freq_mhz()
         start_time = time.perf_counter()
 
-        def sustained_worker(worker_id: int):
-            client = self.create_client()
-            operation_count = 0
-            error_count = 0
-            latencies = []
-
-            while time.perf_counter() - start_time < duration_seconds:
-                try:
-                    key = f"sustained_{worker_id}_{operation_count}"
-                    value = f"value_{worker_id}_{operation_count}"
-
-                    op_start = time.perf_counter()
-                    result = client.set(key, value)
-                    op_end = time.perf_counter()
-
-                    if result == 1:
-                        latencies.append(op_end - op_start)
-                    else:
-                        error_count += 1
-
-                    operation_count += 1
-
-                except Exception as e:
-                    error_count += 1
-                    print(f"Sustained worker {worker_id} error: {e}")
-
-            return {
-                "worker_id": worker_id,
-                "operations": operation_count,
-                "errors": error_count,
-            }
-
         # Run sustained test
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        with self._sustained_executor(num_workers) as executor:
             futures = [
-                executor.submit(sustained_worker, worker_id)
+                executor.submit(
+                    _sustained_worker,
+                    self.host,
+                    self.port,
+                    worker_id,
+                    duration_seconds,
+                )
                 for worker_id in range(num_workers)
             ]
 
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    print(f"Sustained worker failed: {e}")
+            wait(futures)
 
         end_time = time.perf_counter()
+        freq_after = cpu_freq_mhz()
+
+        for future in futures:
+            try:
+                result = future.result()
+                results.append(result)
+            except Exception as e:
+                print(f"Sustained worker failed: {e}")
         actual_duration = end_time - start_time
 
         # Aggregate results
@@ -373,6 +644,9 @@ class LoadTester:
                 "duration_seconds": duration_seconds,
                 "actual_duration": actual_duration,
                 "num_workers": num_workers,
+                "concurrency_model": self.concurrency_model,
+                "scheduling": self.scheduling,
+                "cpu_freq_mhz": {"before": freq_before, "after": freq_after},
             },
             "performance": {
                 "total_operations": total_operations,
@@ -397,34 +671,45 @@ class LoadTester:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Load test the Redis clone")
+    parser.add_argument(
+        "--tune-scheduling",
+        action="store_true",
+        help="pin to a few CPUs and raise priority for the run, "
+        "restoring both afterwards",
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Redis Clone Load Testing")
     print("=" * 60)
 
-    tester = LoadTester()
+    tuning = tuned_scheduling() if args.tune_scheduling else contextlib.nullcontext()
+    with tuning as scheduling:
+        tester = LoadTester(scheduling=scheduling)
 
-    # Run different load tests
-    test_results = {}
+        # Run different load tests
+        test_results = {}
 
-    # 1. Basic load test
-    print("\n1. Basic Load Test (10 workers, 1000 ops each)")
-    basic_result = tester.run_load_test(10, 1000, "SET")
-    test_results["basic_load"] = basic_result
+        # 1. Basic load test
+        print("\n1. Basic Load Test (10 workers, 1000 ops each)")
+        basic_result = tester.run_load_test(10, 1000, "SET")
+        test_results["basic_load"] = basic_result
 
-    # 2. Scaling test
-    print("\n2. Scaling Test")
-    scaling_result = tester.run_scaling_test()
-    test_results["scaling"] = scaling_result
+        # 2. Scaling test
+        print("\n2. Scaling Test")
+        scaling_result = tester.run_scaling_test()
+        test_results["scaling"] = scaling_result
 
-    # 3. Sustained load test
-    print("\n3. Sustained Load Test (30 seconds)")
-    sustained_result = tester.run_sustained_load_test(30, 10)
-    test_results["sustained"] = sustained_result
+        # 3. Sustained load test
+        print("\n3. Sustained Load Test (30 seconds)")
+        sustained_result = tester.run_sustained_load_test(30, 10)
+        test_results["sustained"] = sustained_result
 
-    # 4. Mixed operations test
-    print("\n4. Mixed Operations Load Test")
-    mixed_result = tester.run_load_test(10, 1000, "MIXED")
-    test_results["mixed_operations"] = mixed_result
+        # 4. Mixed operations test
+        print("\n4. Mixed Operations Load Test")
+        mixed_result = tester.run_load_test(10, 1000, "MIXED")
+        test_results["mixed_operations"] = mixed_result
 
     # Save results
     import os
@@ -433,8 +718,12 @@ def main():
     results_dir = "results"
     os.makedirs(results_dir, exist_ok=True)
 
-    with open(os.path.join(results_dir, "load_test_results.json"), "w") as f:
-        json.dump(test_results, f, indent=2)
+    with open(os.path.join(results_dir, "load_test_results.json"), "wb") as f:
+        f.write(
+            orjson.dumps(
+                test_results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            )
+        )
 
     print("\n" + "=" * 60)
     print("Load Testing Complete!")
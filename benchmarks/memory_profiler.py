@@ -1,11 +1,16 @@
+import argparse
+import contextlib
 import gc
-import json
+import math
 import os
 import sys
 import threading
 import time
-from typing import Any, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
+import orjson
 import psutil
 
 # Add src to path
@@ -13,59 +18,112 @@ sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
 )
 
+from bench_common import CONCURRENCY_MODELS, cpu_freq_mhz, tuned_scheduling
+
 from redis_clone import Client
 
+# Commands sent per round trip in the pipelined bulk phases
+PIPELINE_BATCH_SIZE = 128
+
+
+def _concurrent_memory_worker(
+    host: str, port: int, client_id: int, operations_per_client: int
+) -> Dict[str, Any]:
+    # Runs in a child process, so it reports its own RSS growth for the
+    # parent to aggregate
+    meminfo = psutil.Process().memory_info
+    initial_rss = meminfo().rss
+
+    client = Client(host, port)
+    for i in range(operations_per_client):
+        key = b"concurrent_mem_%d_%d" % (client_id, i)
+        value = b"value_%d_%d" % (client_id, i)
+        client.set(key, value)
+
+    final_rss = meminfo().rss
+    return {
+        "pid": os.getpid(),
+        "rss_mb": final_rss / 1024 / 1024,
+        "memory_growth_mb": (final_rss - initial_rss) / 1024 / 1024,
+    }
+
 
 class MemoryProfiler:
-    def __init__(self, host: str = "127.0.0.1", port: int = 31337):
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 31337,
+        scheduling: Optional[Dict[str, Any]] = None,
+    ):
         self.host = host
         self.port = port
         self.memory_samples: List[Dict[str, Any]] = []
         self.process = psutil.Process()
+        # memory_percent() re-reads total system memory on every call;
+        # read it once and derive the percentage from RSS instead
+        self._total_mem = psutil.virtual_memory().total
+        self._meminfo = self.process.memory_info
+        # What tuned_scheduling() applied, if the run is inside it
+        self.scheduling = scheduling
 
     def get_memory_usage(self) -> Dict[str, float]:
-        memory_info = self.process.memory_info()
-        memory_percent = self.process.memory_percent()
+        memory_info = self._meminfo()
 
         return {
             "rss_mb": memory_info.rss / 1024 / 1024,  # Resident Set Size
             "vms_mb": memory_info.vms / 1024 / 1024,  # Virtual Memory Size
-            "percent": memory_percent,
+            "percent": memory_info.rss / self._total_mem * 100,
             "timestamp": time.time(),
         }
 
     def profile_operation_memory(
-        self, operation_name: str, operation_func, *args, **kwargs
+        self,
+        operation_name: str,
+        operation_func,
+        args_list: Sequence[Tuple[Any, ...]],
+        collect_after: bool = True,
     ) -> Dict[str, Any]:
-        # Force garbage collection before measurement
+        num_operations = len(args_list)
+
+        # Force garbage collection once, before the whole batch
         gc.collect()
 
         # Get baseline memory
         baseline = self.get_memory_usage()
 
-        # Perform operation
+        # Perform operations
         start_time = time.perf_counter()
-        result = operation_func(*args, **kwargs)
+        for args in args_list:
+            operation_func(*args)
         end_time = time.perf_counter()
 
-        # Get memory after operation
+        # Get memory after operations
         after_operation = self.get_memory_usage()
+        memory_delta_mb = after_operation["rss_mb"] - baseline["rss_mb"]
 
-        # Force garbage collection and measure again
-        gc.collect()
-        after_gc = self.get_memory_usage()
-
-        return {
+        profile = {
             "operation": operation_name,
+            "num_operations": num_operations,
             "duration_ms": (end_time - start_time) * 1000,
             "baseline_memory": baseline,
             "after_operation_memory": after_operation,
-            "after_gc_memory": after_gc,
-            "memory_delta_mb": after_operation["rss_mb"] - baseline["rss_mb"],
-            "memory_delta_after_gc_mb": after_gc["rss_mb"] - baseline["rss_mb"],
-            "result": result,
+            "memory_delta_mb": memory_delta_mb,
+            "memory_delta_per_operation_kb": memory_delta_mb * 1024 / num_operations
+            if num_operations
+            else 0,
         }
 
+        if collect_after:
+            # Force garbage collection and measure again
+            gc.collect()
+            after_gc = self.get_memory_usage()
+            profile["after_gc_memory"] = after_gc
+            profile["memory_delta_after_gc_mb"] = (
+                after_gc["rss_mb"] - baseline["rss_mb"]
+            )
+
+        return profile
+
     def profile_set_operations(self, num_operations: int = 10000) -> Dict[str, Any]:
         print(f"Profiling SET operations memory usage ({num_operations} operations)...")
 
@@ -75,20 +133,26 @@ class MemoryProfiler:
         # Get initial memory
         initial_memory = self.get_memory_usage()
 
-        # Profile individual operations
-        operation_profiles = []
-        for i in range(min(100, num_operations)):  # Profile first 100 operations
-            key = f"mem_test_{i}"
-            value = f"value_{i}"
-            profile = self.profile_operation_memory("SET", client.set, key, value)
-            operation_profiles.append(profile)
+        # Profile the first 100 operations as one batch
+        operation_profile = self.profile_operation_memory(
+            "SET",
+            client.set,
+            [
+                (b"mem_test_%d" % i, b"value_%d" % i)
+                for i in range(min(100, num_operations))
+            ],
+        )
 
-        # Perform bulk operations
+        # Perform bulk operations, pipelined in batches
         start_time = time.perf_counter()
+        pipe = client.pipeline()
         for i in range(num_operations):
-            key = f"bulk_mem_test_{i}"
-            value = f"bulk_value_{i}"
-            client.set(key, value)
+            key = b"bulk_mem_test_%d" % i
+            value = b"bulk_value_%d" % i
+            pipe.set(key, value)
+            if len(pipe) == PIPELINE_BATCH_SIZE:
+                pipe.execute()
+        pipe.execute()
         end_time = time.perf_counter()
 
         # Get final memory
@@ -113,7 +177,7 @@ class MemoryProfiler:
             )
             * 1024
             / num_operations,
-            "operation_profiles": operation_profiles,
+            "operation_profile": operation_profile,
         }
 
     def profile_get_operations(self, num_operations: int = 10000) -> Dict[str, Any]:
@@ -123,17 +187,23 @@ class MemoryProfiler:
         client.flush()  # Clear database
 
         # Pre-populate with data
+        pipe = client.pipeline()
         for i in range(num_operations):
-            client.set(f"get_mem_test_{i}", f"value_{i}")
+            pipe.set(b"get_mem_test_%d" % i, b"value_%d" % i)
+        pipe.execute()
 
         # Get initial memory
         initial_memory = self.get_memory_usage()
 
-        # Perform GET operations
+        # Perform GET operations, pipelined in batches
         start_time = time.perf_counter()
+        pipe = client.pipeline()
         for i in range(num_operations):
-            key = f"get_mem_test_{i}"
-            client.get(key)
+            key = b"get_mem_test_%d" % i
+            pipe.get(key)
+            if len(pipe) == PIPELINE_BATCH_SIZE:
+                pipe.execute()
+        pipe.execute()
         end_time = time.perf_counter()
 
         # Get final memory
@@ -155,17 +225,23 @@ class MemoryProfiler:
         client.flush()  # Clear database
 
         # Pre-populate with data
+        pipe = client.pipeline()
         for i in range(num_operations):
-            client.set(f"ttl_mem_test_{i}", f"value_{i}")
+            pipe.set(b"ttl_mem_test_%d" % i, b"value_%d" % i)
+        pipe.execute()
 
         # Get initial memory
         initial_memory = self.get_memory_usage()
 
-        # Perform TTL operations
+        # Perform TTL operations, pipelined in batches
         start_time = time.perf_counter()
+        pipe = client.pipeline()
         for i in range(num_operations):
-            key = f"ttl_mem_test_{i}"
-            client.execute("EXPIRE", key, 60)
+            key = b"ttl_mem_test_%d" % i
+            pipe.execute_command("EXPIRE", key, 60)
+            if len(pipe) == PIPELINE_BATCH_SIZE:
+                pipe.execute()
+        pipe.execute()
         end_time = time.perf_counter()
 
         # Get final memory
@@ -190,8 +266,8 @@ class MemoryProfiler:
         client = Client()
         client.flush()  # Clear database
 
-        # Create large value
-        large_value = "x" * (value_size_kb * 1024)
+        # Create large value, already encoded so no SET re-encodes it
+        large_value = b"x" * (value_size_kb * 1024)
 
         # Get initial memory
         initial_memory = self.get_memory_usage()
@@ -199,7 +275,7 @@ class MemoryProfiler:
         # Perform operations with large values
         start_time = time.perf_counter()
         for i in range(num_operations):
-            key = f"large_mem_test_{i}"
+            key = b"large_mem_test_%d" % i
             client.set(key, large_value)
         end_time = time.perf_counter()
 
@@ -238,76 +314,139 @@ class MemoryProfiler:
         client = Client()
         client.flush()  # Clear database
 
-        memory_samples = []
-        start_time = time.perf_counter()
+        # Samples are stored column-wise: one per whole second plus the final
+        # one at end_time
+        max_samples = math.ceil(duration_seconds) + 1
+        elapsed_time = np.zeros(max_samples)
+        operation_counts = np.zeros(max_samples, dtype=np.int64)
+        rss_mb = np.zeros(max_samples)
+        vms_mb = np.zeros(max_samples)
+        num_samples = 0
         operation_count = 0
+        stop_sampling = threading.Event()
+
+        def sample_memory() -> None:
+            nonlocal num_samples
+            memory_info = self._meminfo()
+            i = num_samples
+            elapsed_time[i] = time.perf_counter() - start_time
+            operation_counts[i] = operation_count
+            rss_mb[i] = memory_info.rss / 1024 / 1024
+            vms_mb[i] = memory_info.vms / 1024 / 1024
+            num_samples += 1
+
+        def sampler() -> None:
+            # Sample on whole-second deadlines, independently of the producer.
+            # Only one thread samples at a time, so no lock is needed: the
+            # producer takes the final sample at end_time after joining
+            next_sample = start_time
+            while next_sample < end_time:
+                sample_memory()
+                next_sample += 1.0
+                if stop_sampling.wait(max(0.0, next_sample - time.perf_counter())):
+                    break
+
+        # Pace SETs at operations_per_second for exactly duration_seconds;
+        # memory_info() calls stay out of this loop
+        op_interval = 1.0 / operations_per_second
+        start_time = time.perf_counter()
+        end_time = start_time + duration_seconds
+        next_op = start_time
+
+        sampler_thread = threading.Thread(target=sampler, daemon=True)
+        sampler_thread.start()
+
+        while True:
+            now = time.perf_counter()
+            if now >= end_time:
+                break
 
-        while time.perf_counter() - start_time < duration_seconds:
-            # Perform operations
-            for _ in range(operations_per_second):
-                key = f"growth_test_{operation_count}"
-                value = f"value_{operation_count}"
+            if now >= next_op:
+                # Perform operation; a late schedule catches up without sleeping
+                key = b"growth_test_%d" % operation_count
+                value = b"value_%d" % operation_count
                 client.set(key, value)
                 operation_count += 1
+                next_op += op_interval
+            else:
+                time.sleep(min(next_op, end_time) - now)
 
-            # Sample memory
-            memory_sample = self.get_memory_usage()
-            memory_sample["operation_count"] = operation_count
-            memory_sample["elapsed_time"] = time.perf_counter() - start_time
-            memory_samples.append(memory_sample)
+        stop_sampling.set()
+        sampler_thread.join()
+        sample_memory()
 
-            # Sleep for 1 second
-            time.sleep(1)
+        rss_mb = rss_mb[:num_samples]
 
         return {
             "operation": "MEMORY_GROWTH",
             "duration_seconds": duration_seconds,
             "operations_per_second": operations_per_second,
             "total_operations": operation_count,
-            "memory_samples": memory_samples,
-            "initial_memory_mb": memory_samples[0]["rss_mb"] if memory_samples else 0,
-            "final_memory_mb": memory_samples[-1]["rss_mb"] if memory_samples else 0,
-            "peak_memory_mb": max(sample["rss_mb"] for sample in memory_samples)
-            if memory_samples
-            else 0,
-            "memory_growth_mb": (
-                memory_samples[-1]["rss_mb"] - memory_samples[0]["rss_mb"]
-            )
-            if len(memory_samples) > 1
-            else 0,
+            "memory_samples": {
+                "elapsed_time": elapsed_time[:num_samples],
+                "operation_count": operation_counts[:num_samples],
+                "rss_mb": rss_mb,
+                "vms_mb": vms_mb[:num_samples],
+            },
+            "initial_memory_mb": float(rss_mb[0]),
+            "final_memory_mb": float(rss_mb[-1]),
+            "peak_memory_mb": float(rss_mb.max()),
+            "memory_growth_mb": float(rss_mb[-1] - rss_mb[0]),
         }
 
     def profile_concurrent_memory(
-        self, num_clients: int = 10, operations_per_client: int = 1000
+        self,
+        num_clients: int = 10,
+        operations_per_client: int = 1000,
+        concurrency_model: str = "thread",
     ) -> Dict[str, Any]:
+        if concurrency_model not in CONCURRENCY_MODELS:
+            raise ValueError(f"Unknown concurrency model: {concurrency_model}")
+
         print(
-            f"Profiling concurrent memory usage ({num_clients} clients, {operations_per_client} ops each)..."
+            f"Profiling concurrent memory usage ({num_clients} clients, {operations_per_client} ops each, {concurrency_model})..."
         )
 
+        Client(self.host, self.port).flush()  # Clear database
+
         # Get initial memory
         initial_memory = self.get_memory_usage()
 
         def client_worker(client_id: int):
-            client = Client()
-            client.flush()  # Clear database
+            client = Client(self.host, self.port)
 
             for i in range(operations_per_client):
-                key = f"concurrent_mem_{client_id}_{i}"
-                value = f"value_{client_id}_{i}"
+                key = b"concurrent_mem_%d_%d" % (client_id, i)
+                value = b"value_%d_%d" % (client_id, i)
                 client.set(key, value)
 
         # Run concurrent clients
-        threads = []
+        child_results = []
         start_time = time.perf_counter()
 
-        for client_id in range(num_clients):
-            thread = threading.Thread(target=client_worker, args=(client_id,))
-            threads.append(thread)
-            thread.start()
-
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
+        if concurrency_model == "process":
+            with ProcessPoolExecutor(max_workers=num_clients) as executor:
+                futures = [
+                    executor.submit(
+                        _concurrent_memory_worker,
+                        self.host,
+                        self.port,
+                        client_id,
+                        operations_per_client,
+                    )
+                    for client_id in range(num_clients)
+                ]
+                child_results = [future.result() for future in futures]
+        else:
+            threads = []
+            for client_id in range(num_clients):
+                thread = threading.Thread(target=client_worker, args=(client_id,))
+                threads.append(thread)
+                thread.start()
+
+            # Wait for all threads to complete
+            for thread in threads:
+                thread.join()
 
         end_time = time.perf_counter()
 
@@ -318,18 +457,26 @@ class MemoryProfiler:
         gc.collect()
         final_after_gc = self.get_memory_usage()
 
+        # Child processes' growth is invisible to this process's RSS
+        child_growth_mb = sum(r["memory_growth_mb"] for r in child_results)
+
         return {
             "operation": "CONCURRENT_MEMORY",
             "num_clients": num_clients,
             "operations_per_client": operations_per_client,
+            "concurrency_model": concurrency_model,
             "total_operations": num_clients * operations_per_client,
             "duration_ms": (end_time - start_time) * 1000,
             "initial_memory": initial_memory,
             "final_memory": final_memory,
             "final_after_gc": final_after_gc,
-            "memory_growth_mb": final_memory["rss_mb"] - initial_memory["rss_mb"],
+            "child_processes": child_results,
+            "memory_growth_mb": final_memory["rss_mb"]
+            - initial_memory["rss_mb"]
+            + child_growth_mb,
             "memory_growth_after_gc_mb": final_after_gc["rss_mb"]
-            - initial_memory["rss_mb"],
+            - initial_memory["rss_mb"]
+            + child_growth_mb,
         }
 
     def run_full_memory_profile(self) -> Dict[str, Any]:
@@ -351,7 +498,13 @@ class MemoryProfiler:
 
         for name, profile_func in profiles:
             try:
+                freq_before = cpu_freq_mhz()
                 result = profile_func()
+                result["cpu_freq_mhz"] = {
+                    "before": freq_before,
+                    "after": cpu_freq_mhz(),
+                }
+                result["scheduling"] = self.scheduling
                 profile_results[name] = result
                 self._print_memory_profile(name, result)
             except Exception as e:
@@ -385,8 +538,19 @@ class MemoryProfiler:
 
 
 def main():
-    profiler = MemoryProfiler()
-    results = profiler.run_full_memory_profile()
+    parser = argparse.ArgumentParser(description="Profile Redis clone memory use")
+    parser.add_argument(
+        "--tune-scheduling",
+        action="store_true",
+        help="pin to a few CPUs and raise priority for the run, "
+        "restoring both afterwards",
+    )
+    args = parser.parse_args()
+
+    tuning = tuned_scheduling() if args.tune_scheduling else contextlib.nullcontext()
+    with tuning as scheduling:
+        profiler = MemoryProfiler(scheduling=scheduling)
+        results = profiler.run_full_memory_profile()
 
     print("\n" + "=" * 60)
     print("Memory Profiling Complete!")
@@ -399,8 +563,12 @@ def main():
     results_dir = "results"
     os.makedirs(results_dir, exist_ok=True)
 
-    with open(os.path.join(results_dir, "memory_profile_results.json"), "w") as f:
-        json.dump(results, f, indent=2)
+    with open(os.path.join(results_dir, "memory_profile_results.json"), "wb") as f:
+        f.write(
+            orjson.dumps(
+                results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            )
+        )
     print(f"Results saved to {results_dir}/memory_profile_results.json")
 
 
@@ -1,13 +1,40 @@
-import json
+import mmap
 import os
-import statistics
 import sys
-from typing import Any, Dict, List
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Tuple
 
-# Add src to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
+import orjson
+
+# A detected bottleneck, kept as data; the text is only rendered when the
+# report is printed or saved
+BottleneckMessage = namedtuple("BottleneckMessage", ("kind", "test_name", "value"))
+
+_MESSAGE_TEMPLATES = {
+    "low_throughput": "{test_name}: Very low throughput ({value:.2f} ops/sec)",
+    "high_latency": "{test_name}: High latency ({value:.3f}ms)",
+    "large_values": "{test_name}: Poor performance with large values",
+    "poor_scaling": "Poor scaling with increased concurrency",
+    "scaling_degradation": "Performance degrades with more workers",
+    "low_success_rate": "Low success rate under sustained load: {value:.1f}%",
+    "memory_per_op": "{test_name}: High memory per operation ({value:.2f}KB)",
+    "memory_growth": "{test_name}: Excessive memory growth ({value:.2f}MB)",
+    "memory_leak": "{test_name}: Potential memory leak",
+    "latency_variance": "{test_name}: High latency variance",
+    "outlier_rate": "{test_name}: High outlier rate ({value:.1f}%)",
+}
+
+
+def format_bottleneck(message: BottleneckMessage) -> str:
+    return _MESSAGE_TEMPLATES[message.kind].format(
+        test_name=message.test_name, value=message.value
+    )
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, BottleneckMessage):
+        return {**obj._asdict(), "message": format_bottleneck(obj)}
+    raise TypeError
 
 
 class OptimizationAnalyzer:
@@ -17,6 +44,17 @@ class OptimizationAnalyzer:
         self.memory_results = {}
         self.latency_results = {}
 
+        # Views of each result set split on whether the test errored, built
+        # once so the analyzers don't re-check every entry
+        self.benchmark_ok: Dict[str, Any] = {}
+        self.benchmark_failed: Dict[str, Any] = {}
+        self.load_test_ok: Dict[str, Any] = {}
+        self.load_test_failed: Dict[str, Any] = {}
+        self.memory_ok: Dict[str, Any] = {}
+        self.memory_failed: Dict[str, Any] = {}
+        self.latency_ok: Dict[str, Any] = {}
+        self.latency_failed: Dict[str, Any] = {}
+
     def load_results(self, results_dir: str = "results"):
         result_files = {
             "benchmark": "benchmark_results.json",
@@ -25,25 +63,61 @@ class OptimizationAnalyzer:
             "latency": "latency_analysis_results.json",
         }
 
+        # One directory scan instead of a stat per expected file
+        try:
+            with os.scandir(results_dir) as entries:
+                present = {entry.name: entry.path for entry in entries}
+        except OSError:
+            present = {}
+
         for result_type, filename in result_files.items():
-            filepath = os.path.join(results_dir, filename)
-            if os.path.exists(filepath):
+            filepath = present.get(filename)
+            if filepath is not None:
                 try:
-                    with open(filepath) as f:
-                        if result_type == "benchmark":
-                            self.benchmark_results = json.load(f)
-                        elif result_type == "load_test":
-                            self.load_test_results = json.load(f)
-                        elif result_type == "memory":
-                            self.memory_results = json.load(f)
-                        elif result_type == "latency":
-                            self.latency_results = json.load(f)
+                    data = self._read_json(filepath)
+                    if result_type == "benchmark":
+                        self.benchmark_results = data
+                    elif result_type == "load_test":
+                        self.load_test_results = data
+                    elif result_type == "memory":
+                        self.memory_results = data
+                    elif result_type == "latency":
+                        self.latency_results = data
                     print(f"Loaded {result_type} results from {filename}")
                 except Exception as e:
                     print(f"Error loading {filename}: {e}")
             else:
                 print(f"Warning: {filename} not found")
 
+        self.benchmark_ok, self.benchmark_failed = self._split_errors(
+            self.benchmark_results
+        )
+        self.load_test_ok, self.load_test_failed = self._split_errors(
+            self.load_test_results
+        )
+        self.memory_ok, self.memory_failed = self._split_errors(self.memory_results)
+        self.latency_ok, self.latency_failed = self._split_errors(self.latency_results)
+
+    def _split_errors(
+        self, results: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        ok = {}
+        failed = {}
+        for name, result in results.items():
+            if "error" in result:
+                failed[name] = result
+            else:
+                ok[name] = result
+        return ok, failed
+
+    def _read_json(self, filepath: str) -> Any:
+        # Parse straight out of the page cache instead of copying the file
+        # through a buffered text reader
+        with open(filepath, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+
     def analyze_performance_bottlenecks(self) -> Dict[str, Any]:
         print("Analyzing performance bottlenecks...")
 
@@ -73,41 +147,40 @@ class OptimizationAnalyzer:
 
         return bottlenecks
 
-    def _analyze_benchmark_bottlenecks(self) -> Dict[str, List[str]]:
+    def _analyze_benchmark_bottlenecks(self) -> Dict[str, List[BottleneckMessage]]:
+        cpu_bound: List[BottleneckMessage] = []
+        algorithm_inefficiencies: List[BottleneckMessage] = []
         bottlenecks = {
-            "cpu_bound": [],
-            "algorithm_inefficiencies": [],
+            "cpu_bound": cpu_bound,
+            "algorithm_inefficiencies": algorithm_inefficiencies,
         }
 
         # Check for low operations per second
-        for test_name, result in self.benchmark_results.items():
-            if "error" in result:
-                continue
-
+        for test_name, result in self.benchmark_ok.items():
             ops_per_sec = result.get("ops_per_second", 0)
             avg_latency = result.get("avg_latency_ms", 0)
 
             # Low throughput indicators
             if ops_per_sec < 1000:
-                bottlenecks["cpu_bound"].append(
-                    f"{test_name}: Very low throughput ({ops_per_sec:.2f} ops/sec)"
+                cpu_bound.append(
+                    BottleneckMessage("low_throughput", test_name, ops_per_sec)
                 )
 
             # High latency indicators
             if avg_latency > 10:
-                bottlenecks["algorithm_inefficiencies"].append(
-                    f"{test_name}: High latency ({avg_latency:.3f}ms)"
+                algorithm_inefficiencies.append(
+                    BottleneckMessage("high_latency", test_name, avg_latency)
                 )
 
             # Check for performance degradation with large values
-            if "Large Values" in test_name and ops_per_sec < 100:
-                bottlenecks["algorithm_inefficiencies"].append(
-                    f"{test_name}: Poor performance with large values"
+            if ops_per_sec < 100 and "Large Values" in test_name:
+                algorithm_inefficiencies.append(
+                    BottleneckMessage("large_values", test_name, ops_per_sec)
                 )
 
         return bottlenecks
 
-    def _analyze_load_test_bottlenecks(self) -> Dict[str, List[str]]:
+    def _analyze_load_test_bottlenecks(self) -> Dict[str, List[BottleneckMessage]]:
         bottlenecks = {
             "concurrency_issues": [],
             "network_bound": [],
@@ -140,13 +213,13 @@ class OptimizationAnalyzer:
 
                 if max_ops < base_ops * 2:  # Less than 2x improvement with more workers
                     bottlenecks["concurrency_issues"].append(
-                        "Poor scaling with increased concurrency"
+                        BottleneckMessage("poor_scaling", None, max_ops)
                     )
 
                 # Check for performance degradation
                 if max(ops_per_sec) < base_ops:
                     bottlenecks["concurrency_issues"].append(
-                        "Performance degrades with more workers"
+                        BottleneckMessage("scaling_degradation", None, max_ops)
                     )
 
         # Analyze sustained load results
@@ -157,20 +230,18 @@ class OptimizationAnalyzer:
             success_rate = performance.get("success_rate", 100)
             if success_rate < 95:
                 bottlenecks["network_bound"].append(
-                    f"Low success rate under sustained load: {success_rate:.1f}%"
+                    BottleneckMessage("low_success_rate", None, success_rate)
                 )
 
         return bottlenecks
 
-    def _analyze_memory_bottlenecks(self) -> Dict[str, List[str]]:
+    def _analyze_memory_bottlenecks(self) -> Dict[str, List[BottleneckMessage]]:
+        memory_bound: List[BottleneckMessage] = []
         bottlenecks = {
-            "memory_bound": [],
+            "memory_bound": memory_bound,
         }
 
-        for test_name, result in self.memory_results.items():
-            if "error" in result:
-                continue
-
+        for test_name, result in self.memory_ok.items():
             # Check for high memory growth
             memory_growth = result.get("memory_growth_mb", 0)
             num_operations = result.get("num_operations", 1)
@@ -181,57 +252,55 @@ class OptimizationAnalyzer:
                 ) / num_operations  # KB per operation
 
                 if memory_per_op > 1:  # More than 1KB per operation
-                    bottlenecks["memory_bound"].append(
-                        f"{test_name}: High memory per operation ({memory_per_op:.2f}KB)"
+                    memory_bound.append(
+                        BottleneckMessage("memory_per_op", test_name, memory_per_op)
                     )
 
                 if memory_growth > 100:  # More than 100MB growth
-                    bottlenecks["memory_bound"].append(
-                        f"{test_name}: Excessive memory growth ({memory_growth:.2f}MB)"
+                    memory_bound.append(
+                        BottleneckMessage("memory_growth", test_name, memory_growth)
                     )
 
             # Check for memory leaks (high growth after GC)
             memory_after_gc = result.get("memory_growth_after_gc_mb", 0)
             if memory_after_gc > memory_growth * 0.8:  # Most memory not freed by GC
-                bottlenecks["memory_bound"].append(
-                    f"{test_name}: Potential memory leak"
+                memory_bound.append(
+                    BottleneckMessage("memory_leak", test_name, memory_after_gc)
                 )
 
         return bottlenecks
 
-    def _analyze_latency_bottlenecks(self) -> Dict[str, List[str]]:
+    def _analyze_latency_bottlenecks(self) -> Dict[str, List[BottleneckMessage]]:
+        algorithm_inefficiencies: List[BottleneckMessage] = []
         bottlenecks = {
-            "algorithm_inefficiencies": [],
+            "algorithm_inefficiencies": algorithm_inefficiencies,
         }
 
-        for test_name, result in self.latency_results.items():
-            if "error" in result:
+        for test_name, result in self.latency_ok.items():
+            stats = result.get("statistics")
+            if stats is None:
                 continue
 
             # Check for high latency variance
-            if "statistics" in result:
-                stats = result["statistics"]
-                std_dev = stats.get("std_dev_ms", 0)
-                avg_latency = stats.get("avg_latency_ms", 0)
-
-                if std_dev > avg_latency * 0.5:  # High variance
-                    bottlenecks["algorithm_inefficiencies"].append(
-                        f"{test_name}: High latency variance"
-                    )
+            std_dev = stats.get("std_dev_ms", 0)
+            avg_latency = stats.get("avg_latency_ms", 0)
+            if std_dev > avg_latency * 0.5:  # High variance
+                algorithm_inefficiencies.append(
+                    BottleneckMessage("latency_variance", test_name, std_dev)
+                )
 
             # Check for outliers
-            if "statistics" in result:
-                stats = result["statistics"]
-                outlier_percentage = stats.get("outlier_percentage", 0)
-
-                if outlier_percentage > 5:  # More than 5% outliers
-                    bottlenecks["algorithm_inefficiencies"].append(
-                        f"{test_name}: High outlier rate ({outlier_percentage:.1f}%)"
-                    )
+            outlier_percentage = stats.get("outlier_percentage", 0)
+            if outlier_percentage > 5:  # More than 5% outliers
+                algorithm_inefficiencies.append(
+                    BottleneckMessage("outlier_rate", test_name, outlier_percentage)
+                )
 
         return bottlenecks
 
-    def generate_optimization_recommendations(self) -> Dict[str, List[str]]:
+    def generate_optimization_recommendations(
+        self, bottlenecks: Optional[Dict[str, List[BottleneckMessage]]] = None
+    ) -> Dict[str, List[str]]:
         print("Generating optimization recommendations...")
 
         recommendations = {
@@ -240,8 +309,9 @@ class OptimizationAnalyzer:
             "long_term": [],
         }
 
-        # Analyze bottlenecks
-        bottlenecks = self.analyze_performance_bottlenecks()
+        # Analyze bottlenecks unless the caller already has them
+        if bottlenecks is None:
+            bottlenecks = self.analyze_performance_bottlenecks()
 
         # Generate recommendations based on bottlenecks
         if bottlenecks["cpu_bound"]:
@@ -318,8 +388,10 @@ class OptimizationAnalyzer:
         # Bottlenecks analysis
         report["bottlenecks"] = self.analyze_performance_bottlenecks()
 
-        # Optimization recommendations
-        report["recommendations"] = self.generate_optimization_recommendations()
+        # Optimization recommendations, from the same bottleneck analysis
+        report["recommendations"] = self.generate_optimization_recommendations(
+            report["bottlenecks"]
+        )
 
         # Detailed results
         report["detailed_results"] = {
@@ -334,167 +406,170 @@ class OptimizationAnalyzer:
     def _summarize_benchmark_results(self) -> Dict[str, Any]:
         summary = {
             "total_tests": len(self.benchmark_results),
-            "successful_tests": 0,
-            "failed_tests": 0,
+            "successful_tests": len(self.benchmark_ok),
+            "failed_tests": len(self.benchmark_failed),
             "avg_ops_per_second": 0,
             "avg_latency_ms": 0,
         }
 
-        ops_per_sec = []
-        latencies = []
-
-        for _, result in self.benchmark_results.items():
-            if "error" in result:
-                summary["failed_tests"] += 1
-            else:
-                summary["successful_tests"] += 1
-                if "ops_per_second" in result:
-                    ops_per_sec.append(result["ops_per_second"])
-                if "avg_latency_ms" in result:
-                    latencies.append(result["avg_latency_ms"])
-
-        if ops_per_sec:
-            summary["avg_ops_per_second"] = statistics.mean(ops_per_sec)
-        if latencies:
-            summary["avg_latency_ms"] = statistics.mean(latencies)
+        # Running sums, so the results are walked once
+        ops_sum = 0.0
+        ops_count = 0
+        latency_sum = 0.0
+        latency_count = 0
+
+        for result in self.benchmark_ok.values():
+            if "ops_per_second" in result:
+                ops_sum += result["ops_per_second"]
+                ops_count += 1
+            if "avg_latency_ms" in result:
+                latency_sum += result["avg_latency_ms"]
+                latency_count += 1
+
+        if ops_count:
+            summary["avg_ops_per_second"] = ops_sum / ops_count
+        if latency_count:
+            summary["avg_latency_ms"] = latency_sum / latency_count
 
         return summary
 
     def _summarize_load_test_results(self) -> Dict[str, Any]:
         summary = {
             "total_tests": len(self.load_test_results),
-            "successful_tests": 0,
-            "failed_tests": 0,
+            "successful_tests": len(self.load_test_ok),
+            "failed_tests": len(self.load_test_failed),
             "max_concurrent_ops_per_second": 0,
             "avg_success_rate": 0,
         }
 
-        success_rates = []
+        success_rate_sum = 0.0
+        success_rate_count = 0
         max_ops = 0
 
-        for _, result in self.load_test_results.items():
-            if "error" in result:
-                summary["failed_tests"] += 1
-            else:
-                summary["successful_tests"] += 1
-
-                if "performance" in result:
-                    perf = result["performance"]
-                    if "overall_ops_per_second" in perf:
-                        max_ops = max(max_ops, perf["overall_ops_per_second"])
-                    if "success_rate" in perf:
-                        success_rates.append(perf["success_rate"])
+        for result in self.load_test_ok.values():
+            if "performance" in result:
+                perf = result["performance"]
+                if "overall_ops_per_second" in perf:
+                    ops = perf["overall_ops_per_second"]
+                    if ops > max_ops:
+                        max_ops = ops
+                if "success_rate" in perf:
+                    success_rate_sum += perf["success_rate"]
+                    success_rate_count += 1
 
         summary["max_concurrent_ops_per_second"] = max_ops
-        if success_rates:
-            summary["avg_success_rate"] = statistics.mean(success_rates)
+        if success_rate_count:
+            summary["avg_success_rate"] = success_rate_sum / success_rate_count
 
         return summary
 
     def _summarize_memory_results(self) -> Dict[str, Any]:
         summary = {
             "total_tests": len(self.memory_results),
-            "successful_tests": 0,
-            "failed_tests": 0,
+            "successful_tests": len(self.memory_ok),
+            "failed_tests": len(self.memory_failed),
             "max_memory_growth_mb": 0,
             "avg_memory_per_operation_kb": 0,
         }
 
-        memory_growths = []
-        memory_per_ops = []
+        max_growth = 0
+        memory_per_op_sum = 0.0
+        memory_per_op_count = 0
 
-        for _, result in self.memory_results.items():
-            if "error" in result:
-                summary["failed_tests"] += 1
-            else:
-                summary["successful_tests"] += 1
-
-                if "memory_growth_mb" in result:
-                    memory_growths.append(result["memory_growth_mb"])
-                    summary["max_memory_growth_mb"] = max(
-                        summary["max_memory_growth_mb"], result["memory_growth_mb"]
-                    )
+        for result in self.memory_ok.values():
+            if "memory_growth_mb" in result:
+                growth = result["memory_growth_mb"]
+                if growth > max_growth:
+                    max_growth = growth
 
-                if "memory_per_operation_kb" in result:
-                    memory_per_ops.append(result["memory_per_operation_kb"])
+            if "memory_per_operation_kb" in result:
+                memory_per_op_sum += result["memory_per_operation_kb"]
+                memory_per_op_count += 1
 
-        if memory_per_ops:
-            summary["avg_memory_per_operation_kb"] = statistics.mean(memory_per_ops)
+        summary["max_memory_growth_mb"] = max_growth
+        if memory_per_op_count:
+            summary["avg_memory_per_operation_kb"] = (
+                memory_per_op_sum / memory_per_op_count
+            )
 
         return summary
 
     def _summarize_latency_results(self) -> Dict[str, Any]:
         summary = {
             "total_tests": len(self.latency_results),
-            "successful_tests": 0,
-            "failed_tests": 0,
+            "successful_tests": len(self.latency_ok),
+            "failed_tests": len(self.latency_failed),
             "avg_latency_ms": 0,
             "max_latency_ms": 0,
         }
 
-        latencies = []
+        latency_sum = 0.0
+        latency_count = 0
         max_latency = 0
 
-        for _, result in self.latency_results.items():
-            if "error" in result:
-                summary["failed_tests"] += 1
-            else:
-                summary["successful_tests"] += 1
-
-                if "statistics" in result:
-                    stats = result["statistics"]
-                    if "avg_latency_ms" in stats:
-                        latencies.append(stats["avg_latency_ms"])
-                    if "max_latency_ms" in stats:
-                        max_latency = max(max_latency, stats["max_latency_ms"])
-
-        if latencies:
-            summary["avg_latency_ms"] = statistics.mean(latencies)
+        for result in self.latency_ok.values():
+            if "statistics" in result:
+                stats = result["statistics"]
+                if "avg_latency_ms" in stats:
+                    latency_sum += stats["avg_latency_ms"]
+                    latency_count += 1
+                if "max_latency_ms" in stats:
+                    latency = stats["max_latency_ms"]
+                    if latency > max_latency:
+                        max_latency = latency
+
+        if latency_count:
+            summary["avg_latency_ms"] = latency_sum / latency_count
         summary["max_latency_ms"] = max_latency
 
         return summary
 
     def print_report(self, report: Dict[str, Any]):
-        print("\n" + "=" * 80)
-        print("REDIS CLONE PERFORMANCE ANALYSIS REPORT")
-        print("=" * 80)
+        # Collected and written in one go rather than one print per line
+        out: List[str] = []
+
+        out.append("\n" + "=" * 80)
+        out.append("REDIS CLONE PERFORMANCE ANALYSIS REPORT")
+        out.append("=" * 80)
 
         # Summary
-        print("\n SUMMARY")
-        print("-" * 40)
+        out.append("\n SUMMARY")
+        out.append("-" * 40)
         summary = report.get("summary", {})
 
         for category, data in summary.items():
-            print(f"\n{category.upper()}:")
+            out.append(f"\n{category.upper()}:")
             for key, value in data.items():
                 if isinstance(value, float):
-                    print(f"  {key}: {value:.2f}")
+                    out.append(f"  {key}: {value:.2f}")
                 else:
-                    print(f"  {key}: {value}")
+                    out.append(f"  {key}: {value}")
 
         # Bottlenecks
-        print("\n PERFORMANCE BOTTLENECKS")
-        print("-" * 40)
+        out.append("\n PERFORMANCE BOTTLENECKS")
+        out.append("-" * 40)
         bottlenecks = report.get("bottlenecks", {})
 
         for category, issues in bottlenecks.items():
             if issues:
-                print(f"\n{category.upper()}:")
+                out.append(f"\n{category.upper()}:")
                 for issue in issues:
-                    print(f"  • {issue}")
+                    out.append(f"  • {format_bottleneck(issue)}")
 
         # Recommendations
-        print("\n OPTIMIZATION RECOMMENDATIONS")
-        print("-" * 40)
+        out.append("\n OPTIMIZATION RECOMMENDATIONS")
+        out.append("-" * 40)
         recommendations = report.get("recommendations", {})
 
         for priority, recs in recommendations.items():
             if recs:
-                print(f"\n{priority.upper()} PRIORITY:")
+                out.append(f"\n{priority.upper()} PRIORITY:")
                 for rec in recs:
-                    print(f"  • {rec}")
+                    out.append(f"  • {rec}")
+
+        out.append("\n" + "=" * 80)
 
-        print("\n" + "=" * 80)
+        sys.stdout.write("\n".join(out) + "\n")
 
 
 def main():
@@ -514,8 +589,8 @@ def main():
     results_dir = "results"
     os.makedirs(results_dir, exist_ok=True)
 
-    with open(os.path.join(results_dir, "performance_analysis_report.json"), "w") as f:
-        json.dump(report, f, indent=2)
+    with open(os.path.join(results_dir, "performance_analysis_report.json"), "wb") as f:
+        f.write(orjson.dumps(report, default=_json_default, option=orjson.OPT_INDENT_2))
 
     print(f"\nReport saved to {results_dir}/performance_analysis_report.json")
 
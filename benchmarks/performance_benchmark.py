@@ -1,124 +1,219 @@
+import math
 import os
-import statistics
 import sys
-import threading
 import time
-from typing import Any, Dict, List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from itertools import islice, starmap
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
-# Add src to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
+import numpy as np
+import orjson
 
-from redis_clone import Client
+# Add src to path
+_SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if _SRC not in sys.path:
+    sys.path.insert(0, _SRC)
+
+from redis_clone import Client  # noqa: E402
+
+# Commands sent per round trip when measuring pipelined throughput
+PIPELINE_BATCH_SIZE = 128
+
+
+def _run_batch(
+    operation_func: Callable[..., Any],
+    args_list: Sequence[Tuple[Any, ...]],
+    sample_rate: int,
+    samples_ns: Optional[np.ndarray] = None,
+) -> Tuple[int, np.ndarray]:
+    # Returns the batch's total time and the sampled per-op latencies, both
+    # in nanoseconds; the latencies go into samples_ns when one is given
+    mask = sample_rate - 1
+    if samples_ns is None:
+        samples_ns = np.empty((len(args_list) + mask) // (mask + 1), dtype=np.int64)
+    pc = time.perf_counter_ns
+    it = iter(args_list)
+    # Drains an iterator in C, discarding the results
+    consume = deque(maxlen=0).extend
+
+    start_ns = pc()
+    for j in range(len(samples_ns)):
+        args = next(it)
+        op_start = pc()
+        operation_func(*args)
+        samples_ns[j] = pc() - op_start
+        # The unsampled operations between two samples run through
+        # starmap, with no bytecode executed per operation
+        consume(starmap(operation_func, islice(it, mask)))
+    total_ns = pc() - start_ns
+
+    return total_ns, samples_ns
+
+
+def _concurrent_client_worker(
+    host: str,
+    port: int,
+    client_id: int,
+    operations_per_client: int,
+    sample_rate: int,
+    shm_name: str,
+) -> None:
+    # Module level so a process pool can pickle it; each process opens its
+    # own connection and writes its samples straight into its own slice of
+    # the shared block, so nothing is pickled back to the parent
+    client = Client(host, port)
+
+    keys = list(
+        map(f"concurrent_{client_id}_{{}}".format, range(operations_per_client))
+    )
+    values = list(
+        map(f"concurrent_value_{client_id}_{{}}".format, range(operations_per_client))
+    )
+
+    per_client = len(range(0, operations_per_client, sample_rate))
+    shm = SharedMemory(name=shm_name)
+    try:
+        samples_ns = np.ndarray(
+            (per_client,),
+            dtype=np.int64,
+            buffer=shm.buf,
+            offset=client_id * per_client * 8,
+        )
+        _run_batch(client.set, list(zip(keys, values)), sample_rate, samples_ns)
+        del samples_ns
+    finally:
+        shm.close()
 
 
 class PerformanceBenchmark:
-    def __init__(self, host: str = "127.0.0.1", port: int = 31337):
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 31337, sample_rate: int = 16
+    ):
+        if sample_rate < 1 or sample_rate & (sample_rate - 1):
+            raise ValueError(f"sample_rate must be a power of two: {sample_rate}")
+
         self.host = host
         self.port = port
+        # Throughput comes from timing each batch as a whole; only every
+        # sample_rate-th operation is timed on its own for latency stats
+        self.sample_rate = sample_rate
         self.results: Dict[str, List[float]] = {}
+        self._client: Optional[Client] = None
 
     def create_client(self) -> Client:
-        return Client()
-
-    def measure_operation(
-        self, operation_name: str, operation_func, *args, **kwargs
-    ) -> float:
-        start_time = time.perf_counter()
-        _ = operation_func(*args, **kwargs)
-        end_time = time.perf_counter()
-        return end_time - start_time
+        return Client(self.host, self.port)
+
+    def get_client(self) -> Client:
+        # One connection shared by the single-client benchmarks
+        if self._client is None:
+            self._client = self.create_client()
+        return self._client
+
+    def _run_pipelined(
+        self, client: Client, commands: Sequence[Tuple[Any, ...]]
+    ) -> int:
+        # Returns the total time, in nanoseconds, to run commands in batches
+        # of PIPELINE_BATCH_SIZE round trips
+        pipe = client.pipeline()
+        start_ns = time.perf_counter_ns()
+        for command in commands:
+            pipe.execute_command(*command)
+            if len(pipe) == PIPELINE_BATCH_SIZE:
+                pipe.execute()
+        pipe.execute()
+        return time.perf_counter_ns() - start_ns
 
     def benchmark_set_operations(self, num_operations: int = 10000) -> Dict[str, Any]:
         print(f"Benchmarking SET operations ({num_operations} operations)...")
 
-        client = self.create_client()
+        client = self.get_client()
         client.flush()  # Clear database
 
-        times = []
-        for i in range(num_operations):
-            key = f"bench_key_{i}"
-            value = f"bench_value_{i}"
-            duration = self.measure_operation("SET", client.set, key, value)
-            times.append(duration)
+        keys = list(map("bench_key_{}".format, range(num_operations)))
+        values = list(map("bench_value_{}".format, range(num_operations)))
+        args_list = list(zip(keys, values))
+        total_ns, samples_ns = _run_batch(client.set, args_list, self.sample_rate)
+        pipelined_ns = self._run_pipelined(
+            client, [("SET", key, value) for key, value in args_list]
+        )
 
-        return self._calculate_stats("SET", times, num_operations)
+        return self._calculate_stats(
+            "SET", total_ns, samples_ns, num_operations, pipelined_ns
+        )
 
     def benchmark_get_operations(self, num_operations: int = 10000) -> Dict[str, Any]:
         print(f"Benchmarking GET operations ({num_operations} operations)...")
 
-        client = self.create_client()
+        client = self.get_client()
         client.flush()  # Clear database
 
+        keys = list(map("bench_key_{}".format, range(num_operations)))
+        values = list(map("bench_value_{}".format, range(num_operations)))
+
         # Pre-populate with data
-        for i in range(num_operations):
-            client.set(f"bench_key_{i}", f"bench_value_{i}")
+        self._run_pipelined(client, [("SET", k, v) for k, v in zip(keys, values)])
 
-        times = []
-        for i in range(num_operations):
-            key = f"bench_key_{i}"
-            duration = self.measure_operation("GET", client.get, key)
-            times.append(duration)
+        args_list = list(zip(keys))
+        total_ns, samples_ns = _run_batch(client.get, args_list, self.sample_rate)
+        pipelined_ns = self._run_pipelined(client, [("GET", key) for key in keys])
 
-        return self._calculate_stats("GET", times, num_operations)
+        return self._calculate_stats(
+            "GET", total_ns, samples_ns, num_operations, pipelined_ns
+        )
 
     def benchmark_mixed_operations(self, num_operations: int = 10000) -> Dict[str, Any]:
         print(f"Benchmarking mixed operations ({num_operations} operations)...")
 
-        client = self.create_client()
+        client = self.get_client()
         client.flush()  # Clear database
 
-        times = []
-        for i in range(num_operations):
-            key = f"mixed_key_{i}"
-            value = f"mixed_value_{i}"
+        keys = list(map("mixed_key_{}".format, range(num_operations)))
+        values = list(map("mixed_value_{}".format, range(num_operations)))
 
-            # Alternate between SET and GET
-            if i % 2 == 0:
-                duration = self.measure_operation("SET", client.set, key, value)
-            else:
-                duration = self.measure_operation("GET", client.get, key)
-            times.append(duration)
+        # Alternate between SET and GET
+        args_list = [
+            ("SET", keys[i], values[i]) if i % 2 == 0 else ("GET", keys[i])
+            for i in range(num_operations)
+        ]
+        total_ns, samples_ns = _run_batch(client.execute, args_list, self.sample_rate)
 
-        return self._calculate_stats("MIXED", times, num_operations)
+        return self._calculate_stats("MIXED", total_ns, samples_ns, num_operations)
 
     def benchmark_ttl_operations(self, num_operations: int = 5000) -> Dict[str, Any]:
         print(f"Benchmarking TTL operations ({num_operations} operations)...")
 
-        client = self.create_client()
+        client = self.get_client()
         client.flush()  # Clear database
 
+        keys = list(map("ttl_key_{}".format, range(num_operations)))
+        values = list(map("ttl_value_{}".format, range(num_operations)))
+
         # Pre-populate with data
-        for i in range(num_operations):
-            client.set(f"ttl_key_{i}", f"ttl_value_{i}")
-
-        times = []
-        for i in range(num_operations):
-            key = f"ttl_key_{i}"
-            duration = self.measure_operation(
-                "EXPIRE", client.execute, "EXPIRE", key, 60
-            )
-            times.append(duration)
+        self._run_pipelined(client, [("SET", k, v) for k, v in zip(keys, values)])
 
-        return self._calculate_stats("TTL", times, num_operations)
+        args_list = [("EXPIRE", key, 60) for key in keys]
+        total_ns, samples_ns = _run_batch(client.execute, args_list, self.sample_rate)
+
+        return self._calculate_stats("TTL", total_ns, samples_ns, num_operations)
 
     def benchmark_large_values(self, num_operations: int = 1000) -> Dict[str, Any]:
         print(f"Benchmarking large value operations ({num_operations} operations)...")
 
-        client = self.create_client()
+        client = self.get_client()
         client.flush()  # Clear database
 
-        # Create large value (10KB)
-        large_value = "x" * 10240
+        # Create large value (10KB), already encoded so no SET re-encodes it
+        large_value = b"x" * 10240
 
-        times = []
-        for i in range(num_operations):
-            key = f"large_key_{i}"
-            duration = self.measure_operation("SET_LARGE", client.set, key, large_value)
-            times.append(duration)
+        keys = list(map("large_key_{}".format, range(num_operations)))
+        args_list = [(key, large_value) for key in keys]
+        total_ns, samples_ns = _run_batch(client.set, args_list, self.sample_rate)
 
-        return self._calculate_stats("LARGE_VALUES", times, num_operations)
+        return self._calculate_stats(
+            "LARGE_VALUES", total_ns, samples_ns, num_operations
+        )
 
     def benchmark_concurrent_clients(
         self, num_clients: int = 10, operations_per_client: int = 1000
@@ -127,33 +222,44 @@ class PerformanceBenchmark:
             f"Benchmarking concurrent clients ({num_clients} clients, {operations_per_client} ops each)..."
         )
 
-        results = []
-        threads = []
-
-        def client_worker(client_id: int):
-            client = self.create_client()
-            client.flush()  # Clear database for this client
-
-            times = []
-            for i in range(operations_per_client):
-                key = f"concurrent_{client_id}_{i}"
-                value = f"concurrent_value_{client_id}_{i}"
-                duration = self.measure_operation("CONCURRENT", client.set, key, value)
-                times.append(duration)
-
-            results.extend(times)
-
-        # Start all client threads
-        start_time = time.perf_counter()
-        for client_id in range(num_clients):
-            thread = threading.Thread(target=client_worker, args=(client_id,))
-            threads.append(thread)
-            thread.start()
-
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
-        end_time = time.perf_counter()
+        self.get_client().flush()  # Clear database once for all clients
+
+        # Every client's samples land in one shared block, each client in its
+        # own disjoint slice
+        per_client = len(range(0, operations_per_client, self.sample_rate))
+        shm = SharedMemory(create=True, size=max(1, num_clients * per_client * 8))
+        try:
+            # One process per client, so the clients' Python work is not
+            # serialised on a shared GIL
+            with ProcessPoolExecutor(max_workers=num_clients) as executor:
+                # Start the worker processes before the clock does
+                wait([executor.submit(os.getpid) for _ in range(num_clients)])
+
+                start_time = time.perf_counter()
+                futures = [
+                    executor.submit(
+                        _concurrent_client_worker,
+                        self.host,
+                        self.port,
+                        client_id,
+                        operations_per_client,
+                        self.sample_rate,
+                        shm.name,
+                    )
+                    for client_id in range(num_clients)
+                ]
+                wait(futures)
+                end_time = time.perf_counter()
+
+            for future in futures:
+                future.result()  # Surface any worker error
+
+            samples_ns = np.ndarray(
+                (num_clients * per_client,), dtype=np.int64, buffer=shm.buf
+            ).copy()
+        finally:
+            shm.close()
+            shm.unlink()
 
         total_operations = num_clients * operations_per_client
         total_time = end_time - start_time
@@ -163,37 +269,57 @@ class PerformanceBenchmark:
             "total_operations": total_operations,
             "total_time": total_time,
             "ops_per_second": total_operations / total_time,
-            "avg_latency_ms": statistics.mean(results) * 1000,
-            "min_latency_ms": min(results) * 1000,
-            "max_latency_ms": max(results) * 1000,
-            "p95_latency_ms": self._percentile(results, 95) * 1000,
-            "p99_latency_ms": self._percentile(results, 99) * 1000,
+            **self._latency_stats(samples_ns),
         }
 
     def _calculate_stats(
-        self, operation: str, times: List[float], num_operations: int
+        self,
+        operation: str,
+        total_ns: int,
+        samples_ns: np.ndarray,
+        num_operations: int,
+        pipelined_ns: Optional[int] = None,
     ) -> Dict[str, Any]:
-        total_time = sum(times)
+        total_time = total_ns / 1e9
         ops_per_second = num_operations / total_time
 
-        return {
+        stats = {
             "operation": operation,
             "total_operations": num_operations,
             "total_time": total_time,
             "ops_per_second": ops_per_second,
-            "avg_latency_ms": statistics.mean(times) * 1000,
-            "min_latency_ms": min(times) * 1000,
-            "max_latency_ms": max(times) * 1000,
-            "median_latency_ms": statistics.median(times) * 1000,
-            "p95_latency_ms": self._percentile(times, 95) * 1000,
-            "p99_latency_ms": self._percentile(times, 99) * 1000,
-            "std_dev_ms": statistics.stdev(times) * 1000 if len(times) > 1 else 0,
+            "latency_sample_rate": self.sample_rate,
+            "sampled_operations": len(samples_ns),
+            **self._latency_stats(samples_ns),
         }
+        if pipelined_ns is not None:
+            stats["pipelined_ops_per_second"] = num_operations / (pipelined_ns / 1e9)
+            stats["pipeline_batch_size"] = PIPELINE_BATCH_SIZE
+        return stats
+
+    def _latency_stats(self, samples_ns: np.ndarray) -> Dict[str, float]:
+        times_ms = samples_ns / 1e6
+        median, p95, p99 = np.percentile(times_ms, [50, 95, 99]).tolist()
+
+        # The mean is computed once and reused for the variance, rather than
+        # having np.std take its own pass to recompute it
+        mean = float(times_ms.mean())
+        n = len(times_ms)
+        if n > 1:
+            deviations = times_ms - mean
+            std_dev = math.sqrt(float(np.dot(deviations, deviations)) / (n - 1))
+        else:
+            std_dev = 0
 
-    def _percentile(self, data: List[float], percentile: int) -> float:
-        sorted_data = sorted(data)
-        index = int(len(sorted_data) * percentile / 100)
-        return sorted_data[min(index, len(sorted_data) - 1)]
+        return {
+            "avg_latency_ms": mean,
+            "min_latency_ms": float(times_ms.min()),
+            "max_latency_ms": float(times_ms.max()),
+            "median_latency_ms": median,
+            "p95_latency_ms": p95,
+            "p99_latency_ms": p99,
+            "std_dev_ms": std_dev,
+        }
 
     def run_full_benchmark(self) -> Dict[str, Any]:
         print("=" * 60)
@@ -248,15 +374,18 @@ def main():
     print("=" * 60)
 
     # Save results to file
-    import json
     import os
 
     # Create results directory if it doesn't exist
     results_dir = "results"
     os.makedirs(results_dir, exist_ok=True)
 
-    with open(os.path.join(results_dir, "benchmark_results.json"), "w") as f:
-        json.dump(results, f, indent=2)
+    with open(os.path.join(results_dir, "benchmark_results.json"), "wb") as f:
+        f.write(
+            orjson.dumps(
+                results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            )
+        )
     print(f"Results saved to {results_dir}/benchmark_results.json")
 
 
@@ -1,14 +1,94 @@
-import json
+import argparse
+import functools
 import os
 import sys
 import time
-from typing import Any, Dict
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import orjson
 
 # Add src to path
 sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
 )
 
+# How one metric is compared between two runs. The change is in percent of the
+# baseline when relative, otherwise the plain difference; either way it must
+# move by more than threshold to count as an improvement or a regression.
+MetricSpec = namedtuple(
+    "MetricSpec",
+    ("name", "path", "default", "higher_is_better", "threshold", "relative"),
+)
+
+METRIC_SPECS = {
+    "benchmark": (
+        MetricSpec("ops_per_second", ("ops_per_second",), 0, True, 5, True),
+        MetricSpec("latency", ("avg_latency_ms",), 0, False, 5, True),
+    ),
+    "load_test": (
+        MetricSpec(
+            "ops_per_second",
+            ("performance", "overall_ops_per_second"),
+            0,
+            True,
+            5,
+            True,
+        ),
+        MetricSpec(
+            "success_rate", ("performance", "success_rate"), 100, True, 1, False
+        ),
+    ),
+    "memory": (
+        MetricSpec("memory_growth", ("memory_growth_mb",), 0, False, 5, True),
+        MetricSpec(
+            "memory_per_operation", ("memory_per_operation_kb",), 0, False, 5, True
+        ),
+    ),
+    "latency": (
+        MetricSpec("avg_latency", ("statistics", "avg_latency_ms"), 0, False, 5, True),
+        MetricSpec(
+            "p95_latency", ("statistics", "percentiles", "p95"), 0, False, 5, True
+        ),
+    ),
+}
+
+
+def _read_json(filepath: str) -> Any:
+    with open(filepath, "rb") as f:
+        return orjson.loads(f.read())
+
+
+# Rules drawn between the sections of the printed report
+_HEAVY_RULE = "=" * 80
+_LIGHT_RULE = "-" * 40
+
+
+@functools.lru_cache(maxsize=None)
+def _make_getter(path: Tuple[str, ...]) -> Callable[[Dict[str, Any], Any], Any]:
+    # Built once per metric path: a nested path indexes straight down and
+    # only falls back to the default on a miss, instead of a .get() with an
+    # empty-dict default at every level
+    if len(path) == 1:
+        (key,) = path
+
+        def getter(result: Dict[str, Any], default: Any) -> Any:
+            return result.get(key, default)
+
+    else:
+
+        def getter(result: Dict[str, Any], default: Any) -> Any:
+            try:
+                for key in path:
+                    result = result[key]
+            except KeyError:
+                return default
+            return result
+
+    return getter
+
 
 class PerformanceComparison:
     def __init__(self):
@@ -19,21 +99,24 @@ class PerformanceComparison:
     def load_baseline_results(
         self, baseline_file: str = "results/baseline_performance.json"
     ):
-        if os.path.exists(baseline_file):
-            with open(baseline_file) as f:
-                self.baseline_results = json.load(f)
-            print(f"Loaded baseline results from {baseline_file}")
-        else:
+        try:
+            self.baseline_results = _read_json(baseline_file)
+        except FileNotFoundError:
             print(f"Warning: Baseline file {baseline_file} not found")
+            return
+        print(f"Loaded baseline results from {baseline_file}")
 
     def save_baseline_results(
         self, baseline_file: str = "results/baseline_performance.json"
     ):
-        import os
-
-        os.makedirs("results", exist_ok=True)
-        with open(baseline_file, "w") as f:
-            json.dump(self.current_results, f, indent=2)
+        os.makedirs(os.path.dirname(baseline_file) or ".", exist_ok=True)
+        with open(baseline_file, "wb") as f:
+            f.write(
+                orjson.dumps(
+                    self.current_results,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+                )
+            )
         print(f"Saved baseline results to {baseline_file}")
 
     def load_current_results(self, results_dir: str = "results"):
@@ -44,497 +127,172 @@ class PerformanceComparison:
             "latency": "latency_analysis_results.json",
         }
 
+        # The files are independent, so they are read concurrently; the
+        # messages are still printed in a fixed order afterwards
+        with ThreadPoolExecutor(max_workers=len(result_files)) as executor:
+            futures = {
+                result_type: executor.submit(
+                    _read_json, os.path.join(results_dir, filename)
+                )
+                for result_type, filename in result_files.items()
+            }
+
         for result_type, filename in result_files.items():
-            filepath = os.path.join(results_dir, filename)
-            if os.path.exists(filepath):
-                try:
-                    with open(filepath) as f:
-                        if result_type not in self.current_results:
-                            self.current_results[result_type] = {}
-                        self.current_results[result_type] = json.load(f)
-                    print(f"Loaded {result_type} results from {filename}")
-                except Exception as e:
-                    print(f"Error loading {filename}: {e}")
-            else:
+            try:
+                self.current_results[result_type] = futures[result_type].result()
+                print(f"Loaded {result_type} results from {filename}")
+            except FileNotFoundError:
                 print(f"Warning: {filename} not found")
+            except Exception as e:
+                print(f"Error loading {filename}: {e}")
 
     def compare_benchmark_results(self) -> Dict[str, Any]:
-        if not self.baseline_results.get("benchmark") or not self.current_results.get(
-            "benchmark"
-        ):
-            return {"error": "Missing benchmark results for comparison"}
-
-        baseline = self.baseline_results["benchmark"]
-        current = self.current_results["benchmark"]
-
-        comparison = {
-            "improvements": [],
-            "regressions": [],
-            "unchanged": [],
-            "summary": {
-                "total_tests": 0,
-                "improvements": 0,
-                "regressions": 0,
-                "unchanged": 0,
-            },
-        }
-
-        # Compare each test
-        for test_name in baseline:
-            if test_name not in current:
-                continue
-
-            baseline_result = baseline[test_name]
-            current_result = current[test_name]
-
-            if "error" in baseline_result or "error" in current_result:
-                continue
-
-            comparison["total_tests"] += 1
-
-            # Compare key metrics
-            baseline_ops = baseline_result.get("ops_per_second", 0)
-            current_ops = current_result.get("ops_per_second", 0)
-
-            baseline_latency = baseline_result.get("avg_latency_ms", 0)
-            current_latency = current_result.get("avg_latency_ms", 0)
-
-            # Calculate improvements
-            ops_improvement = (
-                ((current_ops - baseline_ops) / baseline_ops * 100)
-                if baseline_ops > 0
-                else 0
-            )
-            latency_improvement = (
-                ((baseline_latency - current_latency) / baseline_latency * 100)
-                if baseline_latency > 0
-                else 0
-            )
-
-            # Determine if it's an improvement, regression, or unchanged
-            if ops_improvement > 5 or latency_improvement > 5:  # 5% threshold
-                comparison["improvements"].append(
-                    {
-                        "test": test_name,
-                        "ops_per_second": {
-                            "baseline": baseline_ops,
-                            "current": current_ops,
-                            "improvement": ops_improvement,
-                        },
-                        "latency": {
-                            "baseline": baseline_latency,
-                            "current": current_latency,
-                            "improvement": latency_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["improvements"] += 1
-            elif ops_improvement < -5 or latency_improvement < -5:  # 5% threshold
-                comparison["regressions"].append(
-                    {
-                        "test": test_name,
-                        "ops_per_second": {
-                            "baseline": baseline_ops,
-                            "current": current_ops,
-                            "regression": ops_improvement,
-                        },
-                        "latency": {
-                            "baseline": baseline_latency,
-                            "current": current_latency,
-                            "regression": latency_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["regressions"] += 1
-            else:
-                comparison["unchanged"].append(
-                    {
-                        "test": test_name,
-                        "ops_per_second": {
-                            "baseline": baseline_ops,
-                            "current": current_ops,
-                            "change": ops_improvement,
-                        },
-                        "latency": {
-                            "baseline": baseline_latency,
-                            "current": current_latency,
-                            "change": latency_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["unchanged"] += 1
-
-        return comparison
+        return self._compare("benchmark")[0]
 
     def compare_load_test_results(self) -> Dict[str, Any]:
-        if not self.baseline_results.get("load_test") or not self.current_results.get(
-            "load_test"
-        ):
-            return {"error": "Missing load test results for comparison"}
-
-        baseline = self.baseline_results["load_test"]
-        current = self.current_results["load_test"]
-
-        comparison = {
-            "improvements": [],
-            "regressions": [],
-            "unchanged": [],
-            "summary": {
-                "total_tests": 0,
-                "improvements": 0,
-                "regressions": 0,
-                "unchanged": 0,
-            },
-        }
-
-        # Compare each test
-        for test_name in baseline:
-            if test_name not in current:
-                continue
-
-            baseline_result = baseline[test_name]
-            current_result = current[test_name]
-
-            if "error" in baseline_result or "error" in current_result:
-                continue
-
-            comparison["total_tests"] += 1
-
-            # Compare key metrics
-            baseline_ops = baseline_result.get("performance", {}).get(
-                "overall_ops_per_second", 0
-            )
-            current_ops = current_result.get("performance", {}).get(
-                "overall_ops_per_second", 0
-            )
-
-            baseline_success = baseline_result.get("performance", {}).get(
-                "success_rate", 100
-            )
-            current_success = current_result.get("performance", {}).get(
-                "success_rate", 100
-            )
-
-            # Calculate improvements
-            ops_improvement = (
-                ((current_ops - baseline_ops) / baseline_ops * 100)
-                if baseline_ops > 0
-                else 0
-            )
-            success_improvement = current_success - baseline_success
-
-            # Determine if it's an improvement, regression, or unchanged
-            if (
-                ops_improvement > 5 or success_improvement > 1
-            ):  # 5% ops threshold, 1% success threshold
-                comparison["improvements"].append(
-                    {
-                        "test": test_name,
-                        "ops_per_second": {
-                            "baseline": baseline_ops,
-                            "current": current_ops,
-                            "improvement": ops_improvement,
-                        },
-                        "success_rate": {
-                            "baseline": baseline_success,
-                            "current": current_success,
-                            "improvement": success_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["improvements"] += 1
-            elif (
-                ops_improvement < -5 or success_improvement < -1
-            ):  # 5% ops threshold, 1% success threshold
-                comparison["regressions"].append(
-                    {
-                        "test": test_name,
-                        "ops_per_second": {
-                            "baseline": baseline_ops,
-                            "current": current_ops,
-                            "regression": ops_improvement,
-                        },
-                        "success_rate": {
-                            "baseline": baseline_success,
-                            "current": current_success,
-                            "regression": success_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["regressions"] += 1
-            else:
-                comparison["unchanged"].append(
-                    {
-                        "test": test_name,
-                        "ops_per_second": {
-                            "baseline": baseline_ops,
-                            "current": current_ops,
-                            "change": ops_improvement,
-                        },
-                        "success_rate": {
-                            "baseline": baseline_success,
-                            "current": current_success,
-                            "change": success_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["unchanged"] += 1
-
-        return comparison
+        return self._compare("load_test")[0]
 
     def compare_memory_results(self) -> Dict[str, Any]:
-        if not self.baseline_results.get("memory") or not self.current_results.get(
-            "memory"
-        ):
-            return {"error": "Missing memory results for comparison"}
-
-        baseline = self.baseline_results["memory"]
-        current = self.current_results["memory"]
-
-        comparison = {
-            "improvements": [],
-            "regressions": [],
-            "unchanged": [],
-            "summary": {
-                "total_tests": 0,
-                "improvements": 0,
-                "regressions": 0,
-                "unchanged": 0,
-            },
-        }
-
-        # Compare each test
-        for test_name in baseline:
-            if test_name not in current:
-                continue
-
-            baseline_result = baseline[test_name]
-            current_result = current[test_name]
-
-            if "error" in baseline_result or "error" in current_result:
-                continue
-
-            comparison["total_tests"] += 1
-
-            # Compare key metrics
-            baseline_memory = baseline_result.get("memory_growth_mb", 0)
-            current_memory = current_result.get("memory_growth_mb", 0)
-
-            baseline_per_op = baseline_result.get("memory_per_operation_kb", 0)
-            current_per_op = current_result.get("memory_per_operation_kb", 0)
-
-            # Calculate improvements (lower memory is better)
-            memory_improvement = (
-                ((baseline_memory - current_memory) / baseline_memory * 100)
-                if baseline_memory > 0
-                else 0
-            )
-            per_op_improvement = (
-                ((baseline_per_op - current_per_op) / baseline_per_op * 100)
-                if baseline_per_op > 0
-                else 0
-            )
-
-            # Determine if it's an improvement, regression, or unchanged
-            if memory_improvement > 5 or per_op_improvement > 5:  # 5% threshold
-                comparison["improvements"].append(
-                    {
-                        "test": test_name,
-                        "memory_growth": {
-                            "baseline": baseline_memory,
-                            "current": current_memory,
-                            "improvement": memory_improvement,
-                        },
-                        "memory_per_operation": {
-                            "baseline": baseline_per_op,
-                            "current": current_per_op,
-                            "improvement": per_op_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["improvements"] += 1
-            elif memory_improvement < -5 or per_op_improvement < -5:  # 5% threshold
-                comparison["regressions"].append(
-                    {
-                        "test": test_name,
-                        "memory_growth": {
-                            "baseline": baseline_memory,
-                            "current": current_memory,
-                            "regression": memory_improvement,
-                        },
-                        "memory_per_operation": {
-                            "baseline": baseline_per_op,
-                            "current": current_per_op,
-                            "regression": per_op_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["regressions"] += 1
-            else:
-                comparison["unchanged"].append(
-                    {
-                        "test": test_name,
-                        "memory_growth": {
-                            "baseline": baseline_memory,
-                            "current": current_memory,
-                            "change": memory_improvement,
-                        },
-                        "memory_per_operation": {
-                            "baseline": baseline_per_op,
-                            "current": current_per_op,
-                            "change": per_op_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["unchanged"] += 1
-
-        return comparison
+        return self._compare("memory")[0]
 
     def compare_latency_results(self) -> Dict[str, Any]:
-        if not self.baseline_results.get("latency") or not self.current_results.get(
-            "latency"
+        return self._compare("latency")[0]
+
+    def _compare(
+        self, category: str, detailed: bool = True
+    ) -> Tuple[Dict[str, Any], Tuple[int, int, int, int]]:
+        # Returns the category's comparison along with its (improvements,
+        # regressions, unchanged, total tests) counts; without detailed, only
+        # the summary is filled in and the per-test lists stay empty
+        if not self.baseline_results.get(category) or not self.current_results.get(
+            category
         ):
-            return {"error": "Missing latency results for comparison"}
-
-        baseline = self.baseline_results["latency"]
-        current = self.current_results["latency"]
+            label = category.replace("_", " ")
+            return {"error": f"Missing {label} results for comparison"}, (0, 0, 0, 0)
+
+        baseline = self.baseline_results[category]
+        current = self.current_results[category]
+        specs = METRIC_SPECS[category]
+        getters = [(_make_getter(spec.path), spec.default) for spec in specs]
+
+        # Tests present and error-free in both runs, in baseline order, picked
+        # out up front so the comparison itself never branches on them
+        tests = [
+            (test_name, baseline_result, current[test_name])
+            for test_name, baseline_result in baseline.items()
+            if test_name in current
+            and "error" not in baseline_result
+            and "error" not in current[test_name]
+        ]
+        test_names = [test_name for test_name, _, _ in tests]
+        baseline_values = [
+            [get_metric(result, default) for get_metric, default in getters]
+            for _, result, _ in tests
+        ]
+        current_values = [
+            [get_metric(result, default) for get_metric, default in getters]
+            for _, _, result in tests
+        ]
+
+        # Change per test and metric, signed so that positive is always
+        # better, computed for the whole category at once
+        shape = (len(tests), len(specs))
+        base = np.array(baseline_values, dtype=np.float64).reshape(shape)
+        cur = np.array(current_values, dtype=np.float64).reshape(shape)
+        sign = np.array([1.0 if spec.higher_is_better else -1.0 for spec in specs])
+        relative = np.array([spec.relative for spec in specs])
+        threshold = np.array([spec.threshold for spec in specs], dtype=np.float64)
+
+        deltas = (cur - base) * sign
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent = np.where(base > 0, deltas / base * 100, 0.0)
+        deltas = np.where(relative, percent, deltas)
+
+        # An improvement on any metric wins over a regression on another
+        improved = (deltas > threshold).any(axis=1)
+        regressed = ~improved & (deltas < -threshold).any(axis=1)
+        unchanged = ~(improved | regressed)
 
         comparison = {
             "improvements": [],
             "regressions": [],
             "unchanged": [],
             "summary": {
-                "total_tests": 0,
-                "improvements": 0,
-                "regressions": 0,
-                "unchanged": 0,
+                "total_tests": len(tests),
+                "improvements": int(improved.sum()),
+                "regressions": int(regressed.sum()),
+                "unchanged": int(unchanged.sum()),
             },
         }
+        summary = comparison["summary"]
+
+        if detailed:
+            delta_rows = deltas.tolist()
+            for outcome, change_key, mask in (
+                ("improvements", "improvement", improved),
+                ("regressions", "regression", regressed),
+                ("unchanged", "change", unchanged),
+            ):
+                entries = comparison[outcome]
+                for i in np.flatnonzero(mask).tolist():
+                    entry = {"test": test_names[i]}
+                    for j, spec in enumerate(specs):
+                        entry[spec.name] = {
+                            "baseline": baseline_values[i][j],
+                            "current": current_values[i][j],
+                            change_key: delta_rows[i][j],
+                        }
+                    entries.append(entry)
+
+        counts = (
+            summary["improvements"],
+            summary["regressions"],
+            summary["unchanged"],
+            summary["total_tests"],
+        )
+        return comparison, counts
 
-        # Compare each test
-        for test_name in baseline:
-            if test_name not in current:
-                continue
-
-            baseline_result = baseline[test_name]
-            current_result = current[test_name]
-
-            if "error" in baseline_result or "error" in current_result:
-                continue
-
-            comparison["total_tests"] += 1
-
-            # Compare key metrics
-            baseline_latency = baseline_result.get("statistics", {}).get(
-                "avg_latency_ms", 0
-            )
-            current_latency = current_result.get("statistics", {}).get(
-                "avg_latency_ms", 0
-            )
-
-            baseline_p95 = (
-                baseline_result.get("statistics", {})
-                .get("percentiles", {})
-                .get("p95", 0)
-            )
-            current_p95 = (
-                current_result.get("statistics", {})
-                .get("percentiles", {})
-                .get("p95", 0)
-            )
-
-            # Calculate improvements (lower latency is better)
-            latency_improvement = (
-                ((baseline_latency - current_latency) / baseline_latency * 100)
-                if baseline_latency > 0
-                else 0
-            )
-            p95_improvement = (
-                ((baseline_p95 - current_p95) / baseline_p95 * 100)
-                if baseline_p95 > 0
-                else 0
-            )
-
-            # Determine if it's an improvement, regression, or unchanged
-            if latency_improvement > 5 or p95_improvement > 5:  # 5% threshold
-                comparison["improvements"].append(
-                    {
-                        "test": test_name,
-                        "avg_latency": {
-                            "baseline": baseline_latency,
-                            "current": current_latency,
-                            "improvement": latency_improvement,
-                        },
-                        "p95_latency": {
-                            "baseline": baseline_p95,
-                            "current": current_p95,
-                            "improvement": p95_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["improvements"] += 1
-            elif latency_improvement < -5 or p95_improvement < -5:  # 5% threshold
-                comparison["regressions"].append(
-                    {
-                        "test": test_name,
-                        "avg_latency": {
-                            "baseline": baseline_latency,
-                            "current": current_latency,
-                            "regression": latency_improvement,
-                        },
-                        "p95_latency": {
-                            "baseline": baseline_p95,
-                            "current": current_p95,
-                            "regression": p95_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["regressions"] += 1
-            else:
-                comparison["unchanged"].append(
-                    {
-                        "test": test_name,
-                        "avg_latency": {
-                            "baseline": baseline_latency,
-                            "current": current_latency,
-                            "change": latency_improvement,
-                        },
-                        "p95_latency": {
-                            "baseline": baseline_p95,
-                            "current": current_p95,
-                            "change": p95_improvement,
-                        },
-                    }
-                )
-                comparison["summary"]["unchanged"] += 1
-
-        return comparison
-
-    def create_comprehensive_comparison(self) -> Dict[str, Any]:
+    def create_comprehensive_comparison(self, detailed: bool = True) -> Dict[str, Any]:
         print("Creating comprehensive performance comparison...")
 
-        comparison = {
-            "timestamp": time.time(),
-            "benchmark": self.compare_benchmark_results(),
-            "load_test": self.compare_load_test_results(),
-            "memory": self.compare_memory_results(),
-            "latency": self.compare_latency_results(),
-            "overall_summary": {},
-        }
-
-        # Calculate overall summary
+        # Nothing to compare when either side is missing altogether
+        if not self.baseline_results or not self.current_results:
+            missing = "baseline" if not self.baseline_results else "current"
+            return {
+                "timestamp": time.time_ns(),
+                "error": f"No {missing} results available for comparison",
+                "overall_summary": {
+                    "total_tests": 0,
+                    "total_improvements": 0,
+                    "total_regressions": 0,
+                    "total_unchanged": 0,
+                    "improvement_rate": 0,
+                    "regression_rate": 0,
+                },
+            }
+
+        # The categories share nothing but read-only results, so they are
+        # compared concurrently
+        with ThreadPoolExecutor(max_workers=len(METRIC_SPECS)) as executor:
+            futures = {
+                category: executor.submit(self._compare, category, detailed)
+                for category in METRIC_SPECS
+            }
+
+        comparison = {"timestamp": time.time_ns()}
+
+        # Overall totals are tallied as each category's result is collected
         total_improvements = 0
         total_regressions = 0
         total_unchanged = 0
         total_tests = 0
 
-        for category in ["benchmark", "load_test", "memory", "latency"]:
-            if category in comparison and "summary" in comparison[category]:
-                summary = comparison[category]["summary"]
-                total_improvements += summary.get("improvements", 0)
-                total_regressions += summary.get("regressions", 0)
-                total_unchanged += summary.get("unchanged", 0)
-                total_tests += summary.get("total_tests", 0)
+        for category, future in futures.items():
+            comparison[category], counts = future.result()
+            total_improvements += counts[0]
+            total_regressions += counts[1]
+            total_unchanged += counts[2]
+            total_tests += counts[3]
 
         comparison["overall_summary"] = {
             "total_tests": total_tests,
@@ -552,22 +310,29 @@ class PerformanceComparison:
         return comparison
 
     def print_comparison_report(self, comparison: Dict[str, Any]):
-        print("\n" + "=" * 80)
-        print("REDIS CLONE PERFORMANCE COMPARISON REPORT")
-        print("=" * 80)
+        if "error" in comparison:
+            print(f"\nNo comparison: {comparison['error']}")
+            return
+
+        # Collected and written in one go rather than one print per line
+        lines: List[str] = []
+
+        lines.append("\n" + _HEAVY_RULE)
+        lines.append("REDIS CLONE PERFORMANCE COMPARISON REPORT")
+        lines.append(_HEAVY_RULE)
 
         # Overall summary
-        print("\nOVERALL SUMMARY")
-        print("-" * 40)
+        lines.append("\nOVERALL SUMMARY")
+        lines.append(_LIGHT_RULE)
         overall = comparison.get("overall_summary", {})
-        print(f"Total Tests: {overall.get('total_tests', 0)}")
-        print(
+        lines.append(f"Total Tests: {overall.get('total_tests', 0)}")
+        lines.append(
             f"Improvements: {overall.get('total_improvements', 0)} ({overall.get('improvement_rate', 0):.1f}%)"
         )
-        print(
+        lines.append(
             f"Regressions: {overall.get('total_regressions', 0)} ({overall.get('regression_rate', 0):.1f}%)"
         )
-        print(f"Unchanged: {overall.get('total_unchanged', 0)}")
+        lines.append(f"Unchanged: {overall.get('total_unchanged', 0)}")
 
         # Category comparisons
         categories = ["benchmark", "load_test", "memory", "latency"]
@@ -580,73 +345,114 @@ class PerformanceComparison:
 
         for category in categories:
             if category in comparison and "error" not in comparison[category]:
-                print(f"\n{category_names[category].upper()}")
-                print("-" * 40)
+                lines.append(f"\n{category_names[category].upper()}")
+                lines.append(_LIGHT_RULE)
 
                 cat_data = comparison[category]
                 summary = cat_data.get("summary", {})
 
-                print(f"Tests: {summary.get('total_tests', 0)}")
-                print(f"Improvements: {summary.get('improvements', 0)}")
-                print(f"Regressions: {summary.get('regressions', 0)}")
-                print(f"Unchanged: {summary.get('unchanged', 0)}")
+                lines.append(f"Tests: {summary.get('total_tests', 0)}")
+                lines.append(f"Improvements: {summary.get('improvements', 0)}")
+                lines.append(f"Regressions: {summary.get('regressions', 0)}")
+                lines.append(f"Unchanged: {summary.get('unchanged', 0)}")
 
                 # Show key improvements
                 if cat_data.get("improvements"):
-                    print("\nKey Improvements:")
+                    lines.append("\nKey Improvements:")
                     for improvement in cat_data["improvements"][:3]:  # Show top 3
                         test_name = improvement["test"]
-                        print(f"  • {test_name}")
+                        lines.append(f"  • {test_name}")
 
                 # Show key regressions
                 if cat_data.get("regressions"):
-                    print("\nKey Regressions:")
+                    lines.append("\nKey Regressions:")
                     for regression in cat_data["regressions"][:3]:  # Show top 3
                         test_name = regression["test"]
-                        print(f"  • {test_name}")
+                        lines.append(f"  • {test_name}")
+
+        lines.append("\n" + _HEAVY_RULE)
 
-        print("\n" + "=" * 80)
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Compare current benchmark results against a baseline"
+    )
+    parser.add_argument(
+        "--results-dir",
+        default="results",
+        help="directory holding the current results (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--baseline-file",
+        default="results/baseline_performance.json",
+        help="baseline to compare against (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="save the current results as the new baseline",
+    )
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="only count improvements and regressions, without per-test details",
+    )
+    parser.add_argument(
+        "--max-regression-rate",
+        type=float,
+        default=None,
+        metavar="PERCENT",
+        help="exit with status 1 if more than this percentage of tests regressed",
+    )
+    args = parser.parse_args()
+
     comparison_tool = PerformanceComparison()
 
     # Load current results
-    comparison_tool.load_current_results()
+    comparison_tool.load_current_results(args.results_dir)
 
     # Load baseline results
-    comparison_tool.load_baseline_results()
+    comparison_tool.load_baseline_results(args.baseline_file)
 
     # Create comparison
-    comparison = comparison_tool.create_comprehensive_comparison()
+    comparison = comparison_tool.create_comprehensive_comparison(
+        detailed=not args.summary_only
+    )
 
     # Print report
     comparison_tool.print_comparison_report(comparison)
 
     # Save comparison
-    import os
-
     # Create results directory if it doesn't exist
-    results_dir = "results"
+    results_dir = args.results_dir
     os.makedirs(results_dir, exist_ok=True)
 
     with open(
-        os.path.join(results_dir, "performance_comparison_report.json"), "w"
+        os.path.join(results_dir, "performance_comparison_report.json"), "wb"
     ) as f:
-        json.dump(comparison, f, indent=2)
+        f.write(orjson.dumps(comparison, option=orjson.OPT_INDENT_2))
 
     print(
         f"\nComparison report saved to {results_dir}/performance_comparison_report.json"
     )
 
-    # Option to save current results as new baseline
-    save_baseline = (
-        input("\nSave current results as new baseline? (y/n): ").lower().strip()
-    )
-    if save_baseline == "y":
-        comparison_tool.save_baseline_results()
+    if args.save_baseline:
+        comparison_tool.save_baseline_results(args.baseline_file)
         print("Current results saved as new baseline")
 
+    regression_rate = comparison["overall_summary"]["regression_rate"]
+    if (
+        args.max_regression_rate is not None
+        and regression_rate > args.max_regression_rate
+    ):
+        print(
+            f"Regression rate {regression_rate:.1f}% exceeds "
+            f"{args.max_regression_rate:.1f}%"
+        )
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -1,16 +1,30 @@
 from __future__ import annotations
 
+import mmap
 import os
+import stat
 import threading
 import time
 from enum import Enum
-from io import TextIOWrapper
+from io import BufferedWriter, FileIO
+from typing import Iterable, Sequence
+
+from .protocol import ARRAY_PREFIXES, BULK_STRING_PREFIXES, PREFIX_CACHE_SIZE
+
+# Upper bound on how much serialized data a batch append buffers before
+# handing it to the file object
+BATCH_CHUNK_SIZE = 512 * 1024
+
+# Default amount of data the bytes_per_sync policy lets accumulate between
+# fsyncs
+DEFAULT_BYTES_PER_SYNC = 512 * 1024
 
 
 class FsyncPolicy(Enum):
     ALWAYS = "always"  # fsync after every write
     EVERYSEC = "everysec"  # fsync every second
     NO = "no"  # never fsync (OS decides)
+    BYTES_PER_SYNC = "bytes_per_sync"  # fsync every bytes_interval bytes
 
 
 class AOFManager:
@@ -18,23 +32,50 @@ class AOFManager:
         self,
         aof_file: str = "redis_clone.aof",
         fsync_policy: FsyncPolicy = FsyncPolicy.EVERYSEC,
+        bytes_interval: int = DEFAULT_BYTES_PER_SYNC,
     ):
         self.aof_file = aof_file
         self.fsync_policy = fsync_policy
-        self._file: TextIOWrapper | None = None
+        self.bytes_interval = bytes_interval
+        self._unsynced_bytes = 0
+        self._file: BufferedWriter | FileIO | None = None
         self._lock = threading.Lock()
+        # Per-thread scratch buffer that append_command formats records into
+        self._tls = threading.local()
         self._last_fsync = time.time()
         self._fsync_thread: threading.Thread | None = None
         self._stop_fsync = threading.Event()
+        # EVERYSEC and NO only promise durability within a second or at the
+        # OS's discretion, so their appends stay in the file's user-space
+        # buffer and reach the kernel in large writes from the background
+        # thread rather than with one flush per command
+        self._deferred_flush = fsync_policy in (FsyncPolicy.EVERYSEC, FsyncPolicy.NO)
+        # Group commit for the policies that sync on the append path: records
+        # queue in _pending under the short _pending_lock, and whichever
+        # writer gets _lock next writes and syncs everything queued so far.
+        # Writers whose record was covered by that commit return without
+        # touching the file. Sequence numbers say how far commits have got.
+        self._pending = bytearray()
+        self._pending_lock = threading.Lock()
+        self._pending_seq = 0
+        self._committed_seq = 0
 
     def start(self) -> None:
         with self._lock:
             if self._file is None:
-                # Open file in append mode
-                self._file = open(self.aof_file, "a", encoding="utf-8")
-
-                # Start background fsync thread for everysec policy
-                if self.fsync_policy == FsyncPolicy.EVERYSEC:
+                # Open file in append mode. Deferred policies coalesce appends
+                # in a large user-space buffer; the others write and sync on
+                # every commit anyway, so they write the raw fd directly
+                # instead of copying through a buffer first
+                self._file = open(
+                    self.aof_file,
+                    "ab",
+                    buffering=BATCH_CHUNK_SIZE if self._deferred_flush else 0,
+                )
+
+                # Start the background thread that flushes (and for everysec,
+                # fsyncs) deferred appends
+                if self._deferred_flush:
                     self._stop_fsync.clear()
                     self._fsync_thread = threading.Thread(
                         target=self._fsync_worker, daemon=True
@@ -44,6 +85,8 @@ class AOFManager:
     def stop(self) -> None:
         with self._lock:
             if self._file is not None:
+                self._drain_pending()
+
                 # Stop background fsync thread
                 if self._fsync_thread is not None:
                     self._stop_fsync.set()
@@ -54,40 +97,144 @@ class AOFManager:
                 if self.fsync_policy != FsyncPolicy.NO:
                     self._file.flush()
                     os.fsync(self._file.fileno())
+                    self._unsynced_bytes = 0
 
                 self._file.close()
                 self._file = None
 
+    def _encode_command(
+        self, buf: bytearray, command: str, args: Sequence[str | bytes]
+    ) -> None:
+        # Append the command to buf in Redis protocol
+        n = len(args) + 1
+        buf += ARRAY_PREFIXES[n] if n < PREFIX_CACHE_SIZE else b"*%d\r\n" % n
+
+        for part in (command, *args):
+            data = part if isinstance(part, bytes) else part.encode("utf-8")
+            n = len(data)
+            buf += BULK_STRING_PREFIXES[n] if n < PREFIX_CACHE_SIZE else b"$%d\r\n" % n
+            buf += data
+            buf += b"\r\n"
+
+    def encode_command(self, command: str, *args: str) -> bytes:
+        buf = bytearray()
+        self._encode_command(buf, command, args)
+        return bytes(buf)
+
+    def _scratch_buffer(self) -> bytearray:
+        buf = getattr(self._tls, "buf", None)
+        if buf is None:
+            buf = self._tls.buf = bytearray()
+        else:
+            del buf[:]
+        return buf
+
     def append_command(self, command: str, *args: str) -> None:
         if self._file is None:
             return
 
-        # Format command as Redis protocol
-        parts = [command] + list(args)
-        aof_line = f"*{len(parts)}\r\n"
+        buf = self._scratch_buffer()
+        self._encode_command(buf, command, args)
+
+        if self._deferred_flush:
+            with self._lock:
+                self._file.write(buf)
+        else:
+            self._group_commit(buf)
+
+    def append_raw(self, data: bytes) -> None:
+        # data must already be one or more encoded records
+        if self._file is None:
+            return
+
+        if self._deferred_flush:
+            with self._lock:
+                self._file.write(data)
+        else:
+            self._group_commit(data)
 
-        for part in parts:
-            aof_line += f"${len(part)}\r\n{part}\r\n"
+    def _group_commit(self, data: bytes | bytearray) -> None:
+        with self._pending_lock:
+            self._pending += data
+            self._pending_seq += 1
+            seq = self._pending_seq
 
         with self._lock:
-            self._file.write(aof_line)
+            if self._file is None or self._committed_seq >= seq:
+                # Closed, or a commit that started after ours was queued
+                # already wrote and synced it
+                return
+
+            with self._pending_lock:
+                upto = self._pending_seq
+            written = self._drain_pending()
             self._file.flush()
+            self._sync_written(written)
+            self._committed_seq = upto
+
+    def _drain_pending(self) -> int:
+        # Called with the lock held; hands queued group-commit records to the
+        # file ahead of anything the caller is about to write
+        with self._pending_lock:
+            pending, self._pending = self._pending, bytearray()
+        if pending:
+            self._write(pending)
+        return len(pending)
+
+    def _write(self, data: bytes | bytearray) -> None:
+        # A raw file may accept fewer bytes than given
+        with memoryview(data) as view:
+            written = self._file.write(view)
+            while written < len(view):
+                written += self._file.write(view[written:])
+
+    def append_commands_batch(self, ops: Iterable[Sequence[str]]) -> None:
+        if self._file is None:
+            return
 
-            # Handle fsync based on policy
-            if self.fsync_policy == FsyncPolicy.ALWAYS:
+        with self._lock:
+            buf = bytearray()
+            written = self._drain_pending()
+
+            for command, *args in ops:
+                self._encode_command(buf, command, args)
+
+                if len(buf) >= BATCH_CHUNK_SIZE:
+                    self._write(buf)
+                    written += len(buf)
+                    del buf[:]
+
+            if buf:
+                self._write(buf)
+                written += len(buf)
+
+            if not self._deferred_flush:
+                self._file.flush()
+                # One fsync covers the whole batch
+                self._sync_written(written)
+
+    def _sync_written(self, nbytes: int) -> None:
+        # Called with the lock held after nbytes were written and flushed
+        if self.fsync_policy == FsyncPolicy.ALWAYS:
+            os.fsync(self._file.fileno())
+        elif self.fsync_policy == FsyncPolicy.BYTES_PER_SYNC:
+            self._unsynced_bytes += nbytes
+            if self._unsynced_bytes >= self.bytes_interval:
                 os.fsync(self._file.fileno())
-            elif self.fsync_policy == FsyncPolicy.EVERYSEC:
-                # Background thread handles this
-                pass
-            # NO policy: let OS decide
+                self._unsynced_bytes = 0
+        # EVERYSEC and NO never get here; their writes are deferred to the
+        # background thread
 
     def _fsync_worker(self) -> None:
         while not self._stop_fsync.wait(1.0):  # Wait 1 second or until stop
             with self._lock:
                 if self._file is not None:
                     self._file.flush()
-                    os.fsync(self._file.fileno())
-                    self._last_fsync = time.time()
+                    # NO policy: flushed to the kernel, the OS decides when
+                    # it reaches disk
+                    if self.fsync_policy == FsyncPolicy.EVERYSEC:
+                        os.fsync(self._file.fileno())
+                        self._last_fsync = time.time()
 
     def replay_commands(self, command_handler: callable) -> int:
         if not os.path.exists(self.aof_file):
@@ -95,74 +242,164 @@ class AOFManager:
 
         commands_replayed = 0
         last_valid_position = 0
+        file_size = 0
 
         try:
-            with open(self.aof_file, encoding="utf-8") as f:
-                while True:
-                    try:
-                        # Read array length
-                        line = f.readline()
-                        if not line:
-                            break
-
-                        if not line.startswith("*"):
-                            # Invalid format, truncate here
-                            break
-
-                        num_elements = int(line[1:].strip())
+            with open(self.aof_file, "rb") as f:
+                st = os.fstat(f.fileno())
+                file_size = st.st_size
+
+                if file_size == 0:
+                    return 0
+
+                if stat.S_ISREG(st.st_mode):
+                    # Parse straight out of the page cache instead of
+                    # copying the file through buffered reads
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        if hasattr(mm, "madvise"):
+                            mm.madvise(mmap.MADV_SEQUENTIAL)
+                        commands_replayed, last_valid_position = self._replay_buffer(
+                            mm, command_handler
+                        )
+                else:
+                    commands_replayed, last_valid_position = self._replay_buffer(
+                        f.read(), command_handler
+                    )
 
-                        # Read command and arguments
-                        command_parts = []
-                        for _ in range(num_elements):
-                            # Read string length
-                            length_line = f.readline()
-                            if not length_line.startswith("$"):
-                                # Invalid format, truncate here
-                                break
+        except OSError:
+            # File read error, truncate at last valid position
+            pass
 
-                            length = int(length_line[1:].strip())
+        # Truncate file at last valid position if corruption detected
+        if 0 < last_valid_position < file_size:
+            try:
+                os.truncate(self.aof_file, last_valid_position)
+            except OSError:
+                pass
 
-                            # Read string data
-                            data = f.read(length)
-                            if len(data) != length:
-                                # Incomplete data, truncate here
-                                break
+        return commands_replayed
 
-                            # Skip \r\n
-                            f.read(2)
+    def freeze_and_mmap(self) -> mmap.mmap | bytes:
+        # Make everything appended so far durable and map it for reading,
+        # so it can be replayed straight from the page cache
+        with self._lock:
+            if self._file is not None:
+                self._drain_pending()
+                self._file.flush()
+                os.fsync(self._file.fileno())
 
-                            command_parts.append(data)
+            fd = os.open(self.aof_file, os.O_RDONLY)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    return b""
+                return mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+
+    def replay_from_buffer(
+        self, buf: bytes | mmap.mmap, command_handler: callable
+    ) -> int:
+        commands_replayed, _ = self._replay_buffer(buf, command_handler)
+        return commands_replayed
 
-                        if len(command_parts) != num_elements:
-                            # Incomplete command, truncate here
-                            break
+    def _replay_buffer(
+        self, buf: bytes | mmap.mmap, command_handler: callable
+    ) -> tuple[int, int]:
+        commands_replayed = 0
+        last_valid_position = 0
+        pos = 0
+        end = len(buf)
+        # Bound once; find() on bytes and mmap is a C memchr-style scan
+        find = buf.find
 
-                        # Execute command
-                        if command_parts:
-                            command_handler(command_parts[0], *command_parts[1:])
-                            commands_replayed += 1
-                            last_valid_position = f.tell()
+        while pos < end:
+            try:
+                # Read array length
+                if buf[pos] != 0x2A:  # b"*"
+                    # Invalid format, truncate here
+                    break
+
+                line_end = find(b"\r\n", pos)
+                if line_end == -1:
+                    break
+
+                num_elements = int(buf[pos + 1 : line_end])
+                pos = line_end + 2
+
+                # Read command and arguments
+                command_parts = []
+                for _ in range(num_elements):
+                    # Read string length
+                    if pos >= end or buf[pos] != 0x24:  # b"$"
+                        # Invalid format, truncate here
+                        break
 
-                    except (ValueError, IndexError, UnicodeDecodeError):
-                        # Invalid command format, truncate at last valid position
+                    line_end = find(b"\r\n", pos)
+                    if line_end == -1:
                         break
 
-        except OSError:
-            # File read error, truncate at last valid position
-            pass
+                    length = int(buf[pos + 1 : line_end])
+                    data_start = line_end + 2
+                    data_end = data_start + length
 
-        # Truncate file at last valid position if corruption detected
-        if last_valid_position > 0:
-            try:
-                with open(self.aof_file, "r+", encoding="utf-8") as f:
-                    f.seek(last_valid_position)
-                    f.truncate()
-            except OSError:
-                pass
+                    if length < 0:
+                        break
 
-        return commands_replayed
+                    if buf[data_end : data_end + 2] == b"\r\n":
+                        part = buf[data_start:data_end].decode("utf-8")
+                    else:
+                        legacy = self._decode_legacy_bulk(buf, data_start, length)
+                        if legacy is None:
+                            # Incomplete data, truncate here
+                            break
+                        part, data_end = legacy
+
+                    command_parts.append(part)
+                    pos = data_end + 2
+
+                if len(command_parts) != num_elements:
+                    # Incomplete command, truncate here
+                    break
+
+                # Execute command
+                if command_parts:
+                    command_handler(command_parts[0], *command_parts[1:])
+                    commands_replayed += 1
+                    last_valid_position = pos
+
+            except (ValueError, UnicodeDecodeError):
+                # Invalid command format, truncate at last valid position
+                break
+
+        return commands_replayed, last_valid_position
+
+    @staticmethod
+    def _decode_legacy_bulk(
+        buf: bytes | mmap.mmap, start: int, length: int
+    ) -> tuple[str, int] | None:
+        # Older logs gave bulk lengths in characters rather than UTF-8 bytes;
+        # the two only differ for non-ASCII data. Returns the string and the
+        # offset of its trailing CRLF, or None if this isn't such a record.
+        # A character is at most four bytes, so the slice holds all of it.
+        text = buf[start : start + 4 * length].decode("utf-8", "surrogateescape")
+        text = text[:length]
+        if len(text) != length:
+            return None
+        try:
+            end = start + len(text.encode("utf-8"))
+        except UnicodeEncodeError:
+            # Escaped surrogates stand for bytes that aren't valid UTF-8
+            return None
+        if buf[end : end + 2] != b"\r\n":
+            return None
+        return text, end
 
     def get_file_size(self) -> int:
+        # Count deferred appends still sitting in the write buffer
+        with self._lock:
+            if self._file is not None:
+                self._unsynced_bytes += self._drain_pending()
+                self._file.flush()
         try:
             return os.path.getsize(self.aof_file)
         except OSError:
@@ -4,23 +4,32 @@ from typing import Any
 
 from gevent import socket
 
-from .protocol import Error, ProtocolHandler
+from .protocol import Error, ParseBuffer, ProtocolHandler
 
 
 class DisconnectError(Exception):
     pass
 
 
+# Commands are sent and answered in chunks so that neither side's socket
+# buffers fill up while the other is still writing.
+PIPELINE_CHUNK_SIZE = 1000
+
+
 class Client:
     def __init__(self, host: str = "127.0.0.1", port: int = 31337) -> None:
         self._protocol: ProtocolHandler = ProtocolHandler()
         self._socket: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._socket.connect((host, port))
-        self._fh: Any = self._socket.makefile("rwb")
+        self._reader: ParseBuffer = ParseBuffer(self._socket)
+        self._fh: Any = self._socket.makefile("wb")
+
+    def pipeline(self) -> Pipeline:
+        return Pipeline(self)
 
     def execute(self, *args: str) -> list[str] | Any:
         self._protocol.write_response(self._fh, args)
-        resp = self._protocol.handle_request(self._fh)
+        resp = self._protocol.handle_request(self._reader)
         if isinstance(resp, Error):
             # Return the error message directly instead of wrapping in CommandError
             return [resp.message]
@@ -43,3 +52,52 @@ class Client:
 
     def mset(self, *keys: str) -> int | list[str]:
         return self.execute("MSET", *keys)
+
+
+class Pipeline:
+    def __init__(self, client: Client) -> None:
+        self._client: Client = client
+        self._commands: list[tuple[str, ...]] = []
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def execute_command(self, *args: str) -> Pipeline:
+        self._commands.append(args)
+        return self
+
+    def get(self, key: str) -> Pipeline:
+        return self.execute_command("GET", key)
+
+    def set(self, key: str, value: str) -> Pipeline:
+        return self.execute_command("SET", key, value)
+
+    def delete(self, key: str) -> Pipeline:
+        return self.execute_command("DELETE", key)
+
+    def flush(self) -> Pipeline:
+        return self.execute_command("FLUSH")
+
+    def mget(self, *keys: str) -> Pipeline:
+        return self.execute_command("MGET", *keys)
+
+    def mset(self, *keys: str) -> Pipeline:
+        return self.execute_command("MSET", *keys)
+
+    def execute(self) -> list[Any]:
+        commands, self._commands = self._commands, []
+        protocol = self._client._protocol
+        fh = self._client._fh
+        reader = self._client._reader
+        results: list[Any] = []
+
+        for start in range(0, len(commands), PIPELINE_CHUNK_SIZE):
+            chunk = commands[start : start + PIPELINE_CHUNK_SIZE]
+            protocol.write_responses(fh, chunk)
+            for _ in range(len(chunk)):
+                resp = protocol.handle_request(reader)
+                if isinstance(resp, Error):
+                    resp = [resp.message]
+                results.append(resp)
+
+        return results
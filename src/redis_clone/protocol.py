@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 from collections import namedtuple
-from io import BytesIO
 from typing import Any, Callable
 
 
@@ -16,42 +15,162 @@ class DisconnectError(Exception):
 Error = namedtuple("Error", ("message",))
 
 
+class RawReply(bytes):
+    # A reply that is already RESP-encoded and is written as is
+    pass
+
+
+# Pre-encoded RESP headers for small lengths and integers, which is nearly
+# every header written, so the hot paths skip %-formatting
+PREFIX_CACHE_SIZE = 1024
+BULK_STRING_PREFIXES = [b"$%d\r\n" % i for i in range(PREFIX_CACHE_SIZE)]
+ARRAY_PREFIXES = [b"*%d\r\n" % i for i in range(PREFIX_CACHE_SIZE)]
+INTEGER_REPLIES = {i: b":%d\r\n" % i for i in range(-2, PREFIX_CACHE_SIZE)}
+NIL_REPLY = b"$-1\r\n"
+
+
+# Writers for the reply shapes nearly all traffic uses (bulk string, integer,
+# nil and flat arrays of those), encoded without the isinstance chain in
+# ProtocolHandler._write
+def encode_bulk(data: bytes) -> bytes:
+    n = len(data)
+    prefix = BULK_STRING_PREFIXES[n] if n < PREFIX_CACHE_SIZE else b"$%d\r\n" % n
+    return prefix + data + b"\r\n"
+
+
+def encode_int(n: int) -> bytes:
+    reply = INTEGER_REPLIES.get(n)
+    return reply if reply is not None else b":%d\r\n" % n
+
+
+def encode_bulk_array(items: list[Any] | tuple[Any, ...]) -> bytes | None:
+    # Returns None when an item is not a string or None, so the caller can
+    # fall back to the generic writer
+    n = len(items)
+    parts = [ARRAY_PREFIXES[n] if n < PREFIX_CACHE_SIZE else b"*%d\r\n" % n]
+    append = parts.append
+    for item in items:
+        if item is None:
+            append(NIL_REPLY)
+            continue
+        kind = type(item)
+        if kind is str:
+            item = item.encode("utf-8")
+        elif kind is not bytes:
+            return None
+        size = len(item)
+        append(
+            BULK_STRING_PREFIXES[size]
+            if size < PREFIX_CACHE_SIZE
+            else b"$%d\r\n" % size
+        )
+        append(item)
+        append(b"\r\n")
+    return b"".join(parts)
+
+
+# Bytes asked for per recv(), and how far the read cursor may advance before
+# the consumed prefix of the buffer is discarded
+RECV_SIZE = 65536
+COMPACT_THRESHOLD = 32768
+
+
+class ParseBuffer:
+    # Read side of a socket with the readline()/read() interface the parser
+    # uses. Each recv() pulls in up to RECV_SIZE bytes, and lines are found
+    # with one find() over the buffer, so a pipelined batch of frames costs
+    # one syscall instead of several per frame.
+
+    def __init__(
+        self, sock: Any, before_recv: Callable[[], None] | None = None
+    ) -> None:
+        self._sock = sock
+        # Called before every blocking recv(), so a caller holding back
+        # replies can send them before waiting on the peer
+        self._before_recv = before_recv
+        self._buf = bytearray()
+        self._pos = 0
+
+    def _fill(self) -> bool:
+        if self._pos == len(self._buf):
+            self._buf.clear()
+            self._pos = 0
+        elif self._pos > COMPACT_THRESHOLD:
+            del self._buf[: self._pos]
+            self._pos = 0
+
+        if self._before_recv is not None:
+            self._before_recv()
+        chunk = self._sock.recv(RECV_SIZE)
+        if not chunk:
+            return False
+        self._buf += chunk
+        return True
+
+    def readline(self) -> bytearray:
+        while True:
+            end = self._buf.find(b"\n", self._pos)
+            if end != -1:
+                end += 1
+                break
+            if not self._fill():
+                # Connection closed; hand back whatever is left
+                end = len(self._buf)
+                break
+
+        line = self._buf[self._pos : end]
+        self._pos = end
+        return line
+
+    def read(self, n: int) -> bytearray:
+        while len(self._buf) - self._pos < n:
+            if not self._fill():
+                break
+
+        data = self._buf[self._pos : self._pos + n]
+        self._pos += len(data)
+        return data
+
+
 class ProtocolHandler:
     def __init__(self) -> None:
-        self.handlers: dict[str, Callable[[Any], Any]] = {
-            "+": self.handle_simple_string,
-            "-": self.handle_error,
-            ":": self.handle_integer,
-            "$": self.handle_string,
-            "*": self.handle_array,
-            "%": self.handle_dict,
+        # Keyed by the type byte's value, so dispatch needs no decode
+        self.handlers: dict[int, Callable[[Any, bytes], Any]] = {
+            ord("+"): self.handle_simple_string,
+            ord("-"): self.handle_error,
+            ord(":"): self.handle_integer,
+            ord("$"): self.handle_string,
+            ord("*"): self.handle_array,
+            ord("%"): self.handle_dict,
         }
 
     def handle_request(
         self, socket_file: Any
     ) -> str | Error | int | None | list[Any] | dict[str, Any]:
-        first_byte = socket_file.read(1)
+        # The type byte and its header arrive in one readline, and the
+        # handler gets the header already split off
+        line = socket_file.readline()
 
-        if not first_byte:
+        if not line:
             raise DisconnectError()
 
-        first_byte = first_byte.decode("utf-8")
         try:
-            return self.handlers[first_byte](socket_file)
+            handler = self.handlers[line[0]]
         except KeyError as e:
             raise CommandError("Bad Request") from e
+        return handler(socket_file, line[1:].rstrip(b"\r\n"))
 
-    def handle_simple_string(self, socket_file: Any) -> str:
-        return socket_file.readline().rstrip(b"\r\n").decode("utf-8")
+    def handle_simple_string(self, socket_file: Any, header: bytes) -> str:
+        return header.decode("utf-8")
 
-    def handle_error(self, socket_file: Any) -> Error:
-        return Error(socket_file.readline().rstrip(b"\r\n").decode("utf-8"))
+    def handle_error(self, socket_file: Any, header: bytes) -> Error:
+        return Error(header.decode("utf-8"))
 
-    def handle_integer(self, socket_file: Any) -> int:
-        return int(socket_file.readline().rstrip(b"\r\n"))
+    def handle_integer(self, socket_file: Any, header: bytes) -> int:
+        return int(header)
 
-    def handle_string(self, socket_file: Any) -> str | None:
-        length = int(socket_file.readline().rstrip(b"\r\n"))
+    def handle_string(self, socket_file: Any, header: bytes) -> str | None:
+        length = int(header)
 
         if length == -1:
             return None
@@ -59,46 +178,74 @@ class ProtocolHandler:
         data = socket_file.read(length + 2)[:-2]
         return data.decode("utf-8")
 
-    def handle_array(self, socket_file: Any) -> list[Any]:
-        num_elements = int(socket_file.readline().rstrip(b"\r\n"))
+    def handle_array(self, socket_file: Any, header: bytes) -> list[Any]:
+        num_elements = int(header)
         return [self.handle_request(socket_file) for _ in range(num_elements)]
 
-    def handle_dict(self, socket_file: Any) -> dict[str, Any]:
-        num_items = int(socket_file.readline().rstrip(b"\r\n"))
-        elements = [self.handle_request(socket_file) for _ in range(num_items * 2)]
-        return dict(zip(elements[::2], elements[1::2]))
+    def handle_dict(self, socket_file: Any, header: bytes) -> dict[str, Any]:
+        num_items = int(header)
+        elements = (self.handle_request(socket_file) for _ in range(num_items * 2))
+        return dict(zip(elements, elements))
+
+    def encode(self, data: Any) -> bytes | bytearray:
+        kind = type(data)
+        if kind is RawReply:
+            return data
+        if kind is str:
+            return encode_bulk(data.encode("utf-8"))
+        if kind is int:
+            return encode_int(data)
+        if data is None:
+            return NIL_REPLY
+        if kind is list or kind is tuple:
+            payload = encode_bulk_array(data)
+            if payload is not None:
+                return payload
+
+        # Returned as is; a bytearray goes to the socket without the extra
+        # copy BytesIO.getvalue() made
+        buf = bytearray()
+        self._write(buf, data)
+        return buf
 
     def write_response(self, socket_file: Any, data: Any) -> None:
-        buf = BytesIO()
-        self._write(buf, data)
-        buf.seek(0)
-        socket_file.write(buf.getvalue())
+        socket_file.write(self.encode(data))
+        socket_file.flush()
+
+    def write_responses(self, socket_file: Any, items: Any) -> None:
+        encode = self.encode
+        socket_file.write(b"".join([encode(data) for data in items]))
         socket_file.flush()
 
-    def _write(self, buf: BytesIO, data: Any) -> None:
+    def _write(self, buf: bytearray, data: Any) -> None:
         if isinstance(data, str):
             data = data.encode("utf-8")
         if isinstance(data, bytes):
-            buf.write(b"$%d\r\n" % len(data))
-            buf.write(data)
-            buf.write(b"\r\n")
+            n = len(data)
+            buf.extend(
+                BULK_STRING_PREFIXES[n] if n < PREFIX_CACHE_SIZE else b"$%d\r\n" % n
+            )
+            buf.extend(data)
+            buf.extend(b"\r\n")
         elif isinstance(data, int):
-            buf.write(b":%d\r\n" % data)
+            reply = INTEGER_REPLIES.get(data)
+            buf.extend(reply if reply is not None else b":%d\r\n" % data)
         elif isinstance(data, Error):
             msg = (data.message or "").encode("utf-8")
-            buf.write(b"-")
-            buf.write(msg)
-            buf.write(b"\r\n")
+            buf.extend(b"-")
+            buf.extend(msg)
+            buf.extend(b"\r\n")
         elif isinstance(data, (list, tuple)) and not isinstance(data, Error):
-            buf.write(b"*%d\r\n" % len(data))
+            n = len(data)
+            buf.extend(ARRAY_PREFIXES[n] if n < PREFIX_CACHE_SIZE else b"*%d\r\n" % n)
             for item in data:
                 self._write(buf, item)
         elif isinstance(data, dict):
-            buf.write(b"%%%d\r\n" % len(data))
+            buf.extend(b"%%%d\r\n" % len(data))
             for key, val in data.items():
                 self._write(buf, key)
                 self._write(buf, val)
         elif data is None:
-            buf.write(b"$-1\r\n")
+            buf.extend(NIL_REPLY)
         else:
             raise CommandError("Unrecognized type: %s", type(data))
@@ -1,19 +1,35 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+from itertools import islice
 from typing import Any
 
-from gevent import monkey
+from gevent import monkey, socket
 from gevent.pool import Pool
 from gevent.server import StreamServer
 
 from .aof import AOFManager, FsyncPolicy
 from .errors import ArityError, CommandError, WrongTypeError
-from .protocol import Error, ProtocolHandler
-from .ttl import TTLManager
+from .protocol import (
+    DisconnectError,
+    Error,
+    ParseBuffer,
+    ProtocolHandler,
+    RawReply,
+    encode_bulk,
+)
+from .ttl import NS_PER_MS, TTLManager
 
+_MISSING = object()
 
-class DisconnectError(Exception):
-    pass
+# Writes sweep for expired keys once every REAP_MASK + 1 calls
+REAP_MASK = 1023
+
+# Most GET replies kept pre-encoded
+REPLY_CACHE_SIZE = 10000
+
+# Buffered replies are sent early once they reach this size
+SEND_BUFFER_SIZE = 64 * 1024
 
 
 class Server:
@@ -24,6 +40,7 @@ class Server:
         max_clients: int = 64,
         aof_file: str = "redis_clone.aof",
         fsync_policy: FsyncPolicy = FsyncPolicy.EVERYSEC,
+        ttl_manager: TTLManager | None = None,
     ) -> None:
         self._pool: Pool = Pool(max_clients)
         self._server: StreamServer = StreamServer(
@@ -31,52 +48,108 @@ class Server:
         )
         self._protocol: ProtocolHandler = ProtocolHandler()
         self._kv: dict[str, str] = {}
-        self._ttl_manager: TTLManager = TTLManager()
+        self._ttl_manager: TTLManager = ttl_manager or TTLManager()
+        # Reads check deadlines straight from the manager's dict; every change
+        # to it goes through the manager so its bookkeeping stays consistent
+        self._expiry: dict[str, int] = self._ttl_manager.key_expiry
+        self._now_ns = self._ttl_manager.now_ns
+        self._writes_since_reap = 0
         self._aof_manager: AOFManager = AOFManager(aof_file, fsync_policy)
-        self._commands: dict[str, Any] = self.get_commands()
+        # key -> encoded GET reply, least recently used first. Anything that
+        # changes or drops a key's value evicts its entry
+        self._reply_cache: OrderedDict[str, RawReply] = OrderedDict()
+        self._commands: dict[str, tuple[Any, int | None]] = self.get_commands()
 
-        self._aof_manager.start()
+        # Replay before opening the log so replayed commands aren't re-appended
         commands_replayed = self._aof_manager.replay_commands(self._replay_command)
         if commands_replayed > 0:
             print(f"Replayed {commands_replayed} commands from AOF")
+        self._aof_manager.start()
 
     def _replay_command(self, command: str, *args: str) -> None:
-        if command in self._commands:
-            self._commands[command](*args)
+        entry = self._commands.get(command)
+        if entry is not None:
+            entry[0](*args)
 
     def _log_command(self, command: str, *args: str) -> None:
         self._aof_manager.append_command(command, *args)
 
-    def get_commands(self) -> dict[str, Any]:
-        return {
-            "GET": self.get,
-            "SET": self.set,
-            "DELETE": self.delete,
-            "FLUSH": self.flush,
-            "MGET": self.mget,
-            "MSET": self.mset,
-            "EXPIRE": self.expire,
-            "PEXPIRE": self.pexpire,
-            "TTL": self.ttl,
-            "PTTL": self.pttl,
-            "EXISTS": self.exists,
-            "KEYS": self.keys,
+    def get_commands(self) -> dict[str, tuple[Any, int | None]]:
+        # name -> (handler, exact argument count or None for variadic)
+        commands: dict[str, tuple[Any, int | None]] = {
+            "GET": (self._get_reply, 1),
+            "SET": (self.set, 2),
+            "DELETE": (self.delete, None),
+            "FLUSH": (self.flush, None),
+            "MGET": (self.mget, None),
+            "MSET": (self.mset, None),
+            "EXPIRE": (self.expire, 2),
+            "PEXPIRE": (self.pexpire, 2),
+            "TTL": (self.ttl, 1),
+            "PTTL": (self.pttl, 1),
+            "EXISTS": (self.exists, None),
+            "KEYS": (self.keys, 1),
         }
+        return commands
 
-    def get(self, key: str) -> str | None:
-        if key not in self._kv:
-            return None
+    def _lookup(self, key: str) -> Any:
+        # One probe of each dict, with the expiry check inlined on the same
+        # clock TTLManager uses; returns _MISSING for absent or expired keys
+        value = self._kv.get(key, _MISSING)
+        if value is _MISSING:
+            return _MISSING
 
-        if self._ttl_manager.is_expired(key):
+        expiry = self._expiry.get(key)
+        if expiry is not None and expiry <= self._now_ns():
             del self._kv[key]
             self._ttl_manager.remove_ttl(key)
+            self._reply_cache.pop(key, None)
+            return _MISSING
+
+        return value
+
+    def get(self, key: str) -> str | None:
+        value = self._lookup(key)
+        return None if value is _MISSING else value
+
+    def _get_reply(self, key: str) -> RawReply | None:
+        # GET as sent on the wire, with the encoding of hot keys reused
+        value = self._lookup(key)
+        if value is _MISSING or value is None:
             return None
 
-        return self._kv.get(key)
+        cache = self._reply_cache
+        reply = cache.get(key)
+        if reply is not None:
+            cache.move_to_end(key)
+            return reply
+
+        reply = cache[key] = RawReply(encode_bulk(value.encode("utf-8")))
+        if len(cache) > REPLY_CACHE_SIZE:
+            # Evict the least recently used entry
+            cache.popitem(last=False)
+        return reply
+
+    def _reap_expired(self) -> None:
+        # Writes call this so expired keys nobody reads again still get
+        # freed. Counting writes instead of checking the time keeps the clock
+        # off the write path; the sweep itself is cheap when no TTLs exist.
+        self._writes_since_reap = (self._writes_since_reap + 1) & REAP_MASK
+        if self._writes_since_reap == 0:
+            self._sweep_expired()
+
+    def _sweep_expired(self) -> None:
+        kv = self._kv
+        cache = self._reply_cache
+        for key in self._ttl_manager.cleanup_expired():
+            kv.pop(key, None)
+            cache.pop(key, None)
 
     def set(self, key: str, value: str) -> int:
+        self._reap_expired()
         self._kv[key] = value
         self._ttl_manager.remove_ttl(key)
+        self._reply_cache.pop(key, None)
         self._log_command("SET", key, value)
         return 1
 
@@ -84,6 +157,7 @@ class Server:
         if key in self._kv:
             del self._kv[key]
             self._ttl_manager.remove_ttl(key)
+            self._reply_cache.pop(key, None)
             self._log_command("DELETE", key)
             return 1
         return 0
@@ -92,33 +166,34 @@ class Server:
         kvlen = len(self._kv)
         self._kv.clear()
         self._ttl_manager.clear()
+        self._reply_cache.clear()
         self._log_command("FLUSH")
         return kvlen
 
     def mget(self, *keys: str) -> list[str | None]:
-        res = []
-        for key in keys:
-            if key not in self._kv:
-                res.append(None)
-            elif self._ttl_manager.is_expired(key):
-                del self._kv[key]
-                self._ttl_manager.remove_ttl(key)
-                res.append(None)
-            else:
-                res.append(self._kv.get(key))
-        return res
+        lookup = self._lookup
+        return [None if (v := lookup(key)) is _MISSING else v for key in keys]
 
     def mset(self, *items: str) -> int:
-        pairs = list(zip(items[::2], items[1::2]))
-        for key, value in pairs:
-            self._kv[key] = value
-            self._ttl_manager.remove_ttl(key)
+        self._reap_expired()
+        # zip over one iterator pairs consecutive items without slice copies
+        it = iter(items)
+        self._kv.update(zip(it, it))
+        if self._expiry or self._reply_cache:
+            remove_ttl = self._ttl_manager.remove_ttl
+            uncache = self._reply_cache.pop
+            for key in islice(items, 0, len(items) // 2 * 2, 2):
+                remove_ttl(key)
+                uncache(key, None)
         self._log_command("MSET", *items)
-        return len(pairs)
+        return len(items) // 2
 
     def expire(self, key: str, seconds: int) -> int:
+        seconds = int(seconds)  # AOF replay passes arguments as strings
+        self._reap_expired()
         if key not in self._kv:
             return 0
+        self._reply_cache.pop(key, None)
         if seconds == 0:
             # Immediate expiration - delete the key
             del self._kv[key]
@@ -131,8 +206,11 @@ class Server:
         return result
 
     def pexpire(self, key: str, milliseconds: int) -> int:
+        milliseconds = int(milliseconds)  # AOF replay passes arguments as strings
+        self._reap_expired()
         if key not in self._kv:
             return 0
+        self._reply_cache.pop(key, None)
         if milliseconds == 0:
             # Immediate expiration - delete the key
             del self._kv[key]
@@ -144,49 +222,42 @@ class Server:
             self._log_command("PEXPIRE", key, str(milliseconds))
         return result
 
-    def ttl(self, key: str) -> int:
+    def _remaining_ms(self, key: str) -> int:
+        # -2 if the key is absent or expired, -1 if it has no TTL
         if key not in self._kv:
             return -2  # Key doesn't exist
 
-        if self._ttl_manager.is_expired(key):
-            del self._kv[key]
-            self._ttl_manager.remove_ttl(key)
-            return -2  # Key expired and removed
-
-        ttl_ms = self._ttl_manager.get_ttl(key)
-        if ttl_ms == -1:
+        expiry = self._expiry.get(key)
+        if expiry is None:
             return -1  # Key exists but has no TTL
-        return max(1, ttl_ms // 1000)
 
-    def pttl(self, key: str) -> int:
-        if key not in self._kv:
-            return -2  # Key doesn't exist
-
-        if self._ttl_manager.is_expired(key):
+        remaining_ns = expiry - self._now_ns()
+        if remaining_ns <= 0:
             del self._kv[key]
             self._ttl_manager.remove_ttl(key)
+            self._reply_cache.pop(key, None)
             return -2  # Key expired and removed
+        return remaining_ns // NS_PER_MS
+
+    def ttl(self, key: str) -> int:
+        remaining_ms = self._remaining_ms(key)
+        if remaining_ms < 0:
+            return remaining_ms
+        return max(1, remaining_ms // 1000)
 
-        return self._ttl_manager.get_ttl(key)
+    def pttl(self, key: str) -> int:
+        return self._remaining_ms(key)
 
     def exists(self, *keys: str) -> int:
-        count = 0
-        for key in keys:
-            if key in self._kv and not self._ttl_manager.is_expired(key):
-                count += 1
-        return count
+        lookup = self._lookup
+        return sum(1 for key in keys if lookup(key) is not _MISSING)
 
     def keys(self, pattern: str = "*") -> list[str]:
         if pattern != "*":
             raise CommandError(f"Pattern '{pattern}' not supported")
 
-        # Force cleanup of expired keys and get the list of expired keys
-        expired_keys = self._ttl_manager.cleanup_expired(force=True)
-
-        # Remove expired keys from the main dictionary
-        for key in expired_keys:
-            if key in self._kv:
-                del self._kv[key]
+        # Sweep first so no expired key is listed
+        self._sweep_expired()
 
         return list(self._kv.keys())
 
@@ -202,40 +273,54 @@ class Server:
         if not data:
             raise CommandError("Missing command")
 
-        command = data[0].upper()
-        if command not in self._commands:
-            raise CommandError(command)
-
+        # Clients almost always send upper-case names, so only fold case
+        # when the exact lookup misses
+        command = data[0]
+        entry = self._commands.get(command)
+        if entry is None:
+            command = command.upper()
+            entry = self._commands.get(command)
+            if entry is None:
+                raise CommandError(command)
+
+        handler, arity = entry
         args = data[1:]
-        if command == "GET" and len(args) != 1:
-            raise ArityError(command, 1, len(args))
-        elif command == "SET" and len(args) != 2:
-            raise ArityError(command, 2, len(args))
-        elif command == "EXPIRE" and len(args) != 2:
-            raise ArityError(command, 2, len(args))
-        elif command == "PEXPIRE" and len(args) != 2:
-            raise ArityError(command, 2, len(args))
-        elif command == "TTL" and len(args) != 1:
-            raise ArityError(command, 1, len(args))
-        elif command == "PTTL" and len(args) != 1:
-            raise ArityError(command, 1, len(args))
-        elif command == "KEYS" and len(args) != 1:
-            raise ArityError(command, 1, len(args))
-
-        return self._commands[command](*args)
+        if arity is not None and len(args) != arity:
+            raise ArityError(command, arity, len(args))
+
+        return handler(*args)
 
     def connection_handler(self, conn: Any, address: Any) -> None:
-        socket_file = conn.makefile("rwb")
+        # Replies are written one per command; without TCP_NODELAY, Nagle
+        # holds back every reply after the first in a pipelined batch until
+        # the client's delayed ACK arrives
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # Replies collect here and go out in one sendall() whenever the
+        # reader is about to block, so a pipelined batch that arrived in one
+        # recv() is answered with one send
+        out = bytearray()
+
+        def flush() -> None:
+            if out:
+                conn.sendall(out)
+                out.clear()
+
+        reader = ParseBuffer(conn, before_recv=flush)
+        # Bound once per connection rather than looked up per command
+        handle_request = self._protocol.handle_request
+        get_response = self.get_response
+        encode = self._protocol.encode
 
         try:
             while True:
                 try:
-                    data = self._protocol.handle_request(socket_file)
-                except DisconnectError:
+                    data = handle_request(reader)
+                except (DisconnectError, OSError):
                     break
 
                 try:
-                    resp = self.get_response(data)
+                    resp = get_response(data)
                 except (
                     CommandError,
                     ArityError,
@@ -244,14 +329,16 @@ class Server:
                 ) as exc:
                     resp = Error(str(exc))
 
-                try:
-                    self._protocol.write_response(socket_file, resp)
-                except OSError:
-                    break
+                out += encode(resp)
+                if len(out) >= SEND_BUFFER_SIZE:
+                    try:
+                        flush()
+                    except OSError:
+                        break
         finally:
             try:
-                socket_file.close()
-            except Exception:
+                flush()
+            except OSError:
                 pass
 
     def run(self) -> None:
@@ -2,63 +2,182 @@ from __future__ import annotations
 
 import heapq
 import time
+from typing import Callable
 
+NS_PER_MS = 1_000_000
 
-class TTLManager:
-    def __init__(self) -> None:
-        self.expiry_heap: list[tuple[float, str]] = []
-        self.key_expiry: dict[str, float] = {}
-        self.last_cleanup: float = time.time()
-        self.cleanup_interval: float = 0.1
+# Timing wheel geometry: a tick is 2**TICK_SHIFT ns (~16.8 ms) and the wheel
+# covers WHEEL_SIZE ticks (~69 s) ahead of its cursor. Deadlines further out
+# wait in an overflow heap until the cursor gets close enough.
+TICK_SHIFT = 24
+WHEEL_SIZE = 4096
+WHEEL_MASK = WHEEL_SIZE - 1
+
+# The overflow heap is rebuilt without its dead entries once they make up
+# more than half of it, provided it holds at least this many
+OVERFLOW_COMPACT_MIN = 1024
+
+# Returned by sweeps that expire nothing, so they don't allocate a set
+_NO_KEYS: frozenset[str] = frozenset()
 
-    def set_expiry(self, key: str, ttl_ms: int) -> bool:
+
+class TTLManager:
+    def __init__(self, time_fn: Callable[[], int] = time.monotonic_ns) -> None:
+        # Deadlines are integer nanoseconds on the monotonic clock, so
+        # wall-clock jumps can't move them and comparisons stay int-only.
+        # key_expiry is authoritative; wheel slots and overflow entries are
+        # only hints, checked against it when swept, so overwriting or
+        # removing a TTL never has to find the old entry.
+        self.key_expiry: dict[str, int] = {}
+        self.wheel: list[set[str]] = [set() for _ in range(WHEEL_SIZE)]
+        self.overflow_heap: list[tuple[int, str]] = []
+        # Overflow entries whose TTL has since been replaced or removed
+        self.overflow_stale: int = 0
+        # Current time in monotonic nanoseconds; replaceable so tests can
+        # drive expiry with a fake clock
+        self.now_ns: Callable[[], int] = time_fn
+        # Every tick up to and including the cursor has been swept
+        self.cursor_tick: int = (self.now_ns() >> TICK_SHIFT) - 1
+
+    def _schedule(self, key: str, expiry_time: int) -> None:
+        tick = expiry_time >> TICK_SHIFT
+        cursor = self.cursor_tick
+        if tick - cursor < WHEEL_SIZE:
+            # Deadlines in already-swept ticks go to the next one to sweep
+            self.wheel[max(tick, cursor + 1) & WHEEL_MASK].add(key)
+        else:
+            overflow = self.overflow_heap
+            if self.overflow_stale * 2 > len(overflow) >= OVERFLOW_COMPACT_MIN:
+                self._compact_overflow()
+            heapq.heappush(overflow, (expiry_time, key))
+
+    def _forget(self, expiry_time: int) -> None:
+        # A deadline is being replaced or removed; sweeps drop its wheel hint
+        # on their own, but an overflow entry would sit until it came due.
+        # Between sweeps, overflow holds exactly the deadlines a full wheel
+        # lap or more past the cursor.
+        if (expiry_time >> TICK_SHIFT) - self.cursor_tick >= WHEEL_SIZE:
+            self.overflow_stale += 1
+
+    def _compact_overflow(self) -> None:
+        key_expiry = self.key_expiry
+        # A key re-armed with the same deadline leaves identical entries that
+        # all look live; the set keeps one of them
+        live = list(
+            {
+                entry
+                for entry in self.overflow_heap
+                if key_expiry.get(entry[1]) == entry[0]
+            }
+        )
+        heapq.heapify(live)
+        self.overflow_heap[:] = live
+        self.overflow_stale = 0
+
+    def set_expiry(self, key: str, ttl_ms: int, now_ns: int | None = None) -> bool:
         if ttl_ms < 0:
             return False
 
-        expiry_time = time.time() * 1000 + ttl_ms
+        if now_ns is None:
+            now_ns = self.now_ns()
+        expiry_time = now_ns + ttl_ms * NS_PER_MS
+        previous = self.key_expiry.get(key)
+        if previous is not None:
+            self._forget(previous)
         self.key_expiry[key] = expiry_time
-        heapq.heappush(self.expiry_heap, (expiry_time, key))
+        self._schedule(key, expiry_time)
         return True
 
-    def get_ttl(self, key: str) -> int:
-        if key not in self.key_expiry:
+    def get_ttl(self, key: str, now_ns: int | None = None) -> int:
+        expiry_time = self.key_expiry.get(key)
+        if expiry_time is None:
             return -1  # Key exists but has no TTL set
 
-        remaining_ms = self.key_expiry[key] - (time.time() * 1000)
-        if remaining_ms <= 0:
+        if now_ns is None:
+            now_ns = self.now_ns()
+        remaining_ns = expiry_time - now_ns
+        if remaining_ns <= 0:
             return -1  # TTL expired
-        return int(remaining_ms)
+        return remaining_ns // NS_PER_MS
 
-    def is_expired(self, key: str) -> bool:
-        if key not in self.key_expiry:
+    def is_expired(self, key: str, now_ns: int | None = None) -> bool:
+        expiry_time = self.key_expiry.get(key)
+        if expiry_time is None:
             return False
-        return self.key_expiry[key] <= time.time() * 1000
+        if now_ns is None:
+            now_ns = self.now_ns()
+        return expiry_time <= now_ns
 
     def remove_ttl(self, key: str) -> bool:
-        if key not in self.key_expiry:
+        expiry_time = self.key_expiry.pop(key, None)
+        if expiry_time is None:
             return False
-        del self.key_expiry[key]
+        self._forget(expiry_time)
         return True
 
-    def cleanup_expired(self, force=False) -> set[str]:
-        current_time = time.time()
+    def cleanup_expired(self) -> set[str] | frozenset[str]:
+        # Callers decide how often to sweep; each sweep only visits the
+        # wheel slots elapsed since the previous one
+        # Nothing can expire without TTLs, so don't read the clock at all;
+        # hints left in the wheel are dropped whenever sweeping resumes
+        if not self.key_expiry:
+            return _NO_KEYS
 
-        if not force and current_time - self.last_cleanup < self.cleanup_interval:
-            return set()
-
-        self.last_cleanup = current_time
-        current_time_ms = current_time * 1000
+        # One clock read covers the whole sweep
+        now_ns = self.now_ns()
         expired_keys = set()
-
-        while self.expiry_heap and self.expiry_heap[0][0] <= current_time_ms:
-            expiry_time, key = heapq.heappop(self.expiry_heap)
-
-            if key in self.key_expiry and self.key_expiry[key] == expiry_time:
-                expired_keys.add(key)
-                del self.key_expiry[key]
-
-        return expired_keys
+        expire = expired_keys.add
+        key_expiry = self.key_expiry
+        get_expiry = key_expiry.get
+        wheel = self.wheel
+        now_tick = now_ns >> TICK_SHIFT
+
+        # Ticks before the current one are entirely in the past, so every
+        # key still scheduled in them with a live deadline is due. A wheel
+        # only ever holds one lap, so a long gap sweeps each slot once.
+        start = self.cursor_tick + 1
+        for tick in range(start, min(now_tick, start + WHEEL_SIZE)):
+            slot = wheel[tick & WHEEL_MASK]
+            if slot:
+                for key in slot:
+                    expiry_time = get_expiry(key)
+                    if expiry_time is not None and expiry_time <= now_ns:
+                        del key_expiry[key]
+                        expire(key)
+                slot.clear()
+        self.cursor_tick = max(self.cursor_tick, now_tick - 1)
+
+        # The current tick is only partly over; take what is due and leave
+        # the rest for the next sweep
+        slot = wheel[now_tick & WHEEL_MASK]
+        for key in [key for key in slot if get_expiry(key, now_ns) <= now_ns]:
+            slot.discard(key)
+            # pop() both checks the hint is live and removes it
+            if key_expiry.pop(key, None) is not None:
+                expire(key)
+
+        # Pull overflow deadlines that now fall within the wheel's reach
+        overflow = self.overflow_heap
+        heappop = heapq.heappop
+        horizon = self.cursor_tick + WHEEL_SIZE
+        while overflow and overflow[0][0] >> TICK_SHIFT < horizon:
+            expiry_time, key = heappop(overflow)
+            if get_expiry(key) != expiry_time:
+                # TTL was removed or replaced since
+                if self.overflow_stale:
+                    self.overflow_stale -= 1
+                continue
+            if expiry_time <= now_ns:
+                del key_expiry[key]
+                expire(key)
+            else:
+                self._schedule(key, expiry_time)
+
+        return expired_keys or _NO_KEYS
 
     def clear(self) -> None:
-        self.expiry_heap.clear()
+        for slot in self.wheel:
+            slot.clear()
+        self.overflow_heap.clear()
+        self.overflow_stale = 0
         self.key_expiry.clear()
@@ -235,5 +235,27 @@ def test_connection_reuse(client):
     assert client.get("reuse2") == "value2"
 
 
+def test_pipeline(client):
+    pipe = client.pipeline()
+    pipe.set("pipe1", "value1").set("pipe2", "value2")
+    pipe.get("pipe1").mget("pipe1", "pipe2", "missing")
+    pipe.execute_command("UNKNOWN")
+    assert len(pipe) == 5
+
+    results = pipe.execute()
+    assert results[:4] == [1, 1, "value1", ["value1", "value2", None]]
+    assert isinstance(results[4], list)
+    assert len(pipe) == 0
+    assert pipe.execute() == []
+
+
+def test_pipeline_many_commands(client):
+    pipe = client.pipeline()
+    for i in range(2500):
+        pipe.set(f"pipe_many_{i}", f"value_{i}")
+    assert pipe.execute() == [1] * 2500
+    assert client.get("pipe_many_2499") == "value_2499"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import os
 import sys
-import time
 from typing import Generator
 
 import pytest
@@ -11,7 +10,19 @@ sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
 )
 
-from redis_clone import Client
+from redis_clone import Client, Server
+from redis_clone.ttl import NS_PER_MS, OVERFLOW_COMPACT_MIN, TTLManager
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now_ns = 1_000_000 * NS_PER_MS
+
+    def __call__(self) -> int:
+        return self.now_ns
+
+    def advance(self, ms: int) -> None:
+        self.now_ns += ms * NS_PER_MS
 
 
 @pytest.fixture
@@ -22,6 +33,24 @@ def client() -> Generator[Client, None, None]:
     return client
 
 
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def server(clock: FakeClock, tmp_path) -> Generator[Server, None, None]:
+    # In-process server on a fake clock, so expiry tests advance time
+    # instead of sleeping
+    server = Server(
+        port=0,
+        aof_file=str(tmp_path / "ttl_test.aof"),
+        ttl_manager=TTLManager(time_fn=clock),
+    )
+    yield server
+    server.shutdown()
+
+
 def test_expire_command(client: Client) -> None:
     client.set("test_key", "value")
 
@@ -108,47 +137,45 @@ def test_expire_nonexistent_key(client: Client) -> None:
     assert client.execute("PEXPIRE", "nonexistent_key", 10000) == 0
 
 
-def test_ttl_expiration(client: Client) -> None:
-    client.set("expire_key", "value")
+def test_ttl_expiration(server: Server, clock: FakeClock) -> None:
+    server.set("expire_key", "value")
 
     # Set very short TTL
-    assert client.execute("EXPIRE", "expire_key", 1) == 1
+    assert server.expire("expire_key", 1) == 1
 
     # Key should still exist
-    assert client.get("expire_key") == "value"
+    assert server.get("expire_key") == "value"
 
     # TTL should be 1
-    ttl = client.execute("TTL", "expire_key")
-    assert ttl == 1
+    assert server.ttl("expire_key") == 1
 
-    # Wait for expiration
-    time.sleep(1.1)
+    # Move past expiration
+    clock.advance(1100)
 
     # Key should be expired
-    assert client.get("expire_key") is None
-    assert client.execute("TTL", "expire_key") == -2
-    assert client.execute("PTTL", "expire_key") == -2
+    assert server.get("expire_key") is None
+    assert server.ttl("expire_key") == -2
+    assert server.pttl("expire_key") == -2
 
 
-def test_pexpire_expiration(client: Client) -> None:
-    client.set("pexpire_key", "value")
+def test_pexpire_expiration(server: Server, clock: FakeClock) -> None:
+    server.set("pexpire_key", "value")
 
     # Set very short TTL (100ms)
-    assert client.execute("PEXPIRE", "pexpire_key", 100) == 1
+    assert server.pexpire("pexpire_key", 100) == 1
 
     # Key should still exist
-    assert client.get("pexpire_key") == "value"
+    assert server.get("pexpire_key") == "value"
 
-    # PTTL should be around 100ms
-    pttl = client.execute("PTTL", "pexpire_key")
-    assert 50 <= pttl <= 100
+    # PTTL should be exactly 100ms on a stopped clock
+    assert server.pttl("pexpire_key") == 100
 
-    # Wait for expiration
-    time.sleep(0.15)
+    # Move past expiration
+    clock.advance(150)
 
     # Key should be expired
-    assert client.get("pexpire_key") is None
-    assert client.execute("PTTL", "pexpire_key") == -2
+    assert server.get("pexpire_key") is None
+    assert server.pttl("pexpire_key") == -2
 
 
 def test_ttl_update(client: Client) -> None:
@@ -180,49 +207,49 @@ def test_ttl_remove(client: Client) -> None:
     assert client.execute("TTL", "remove_key") == -1
 
 
-def test_exists_with_ttl(client: Client) -> None:
-    client.set("exists_key", "value")
+def test_exists_with_ttl(server: Server, clock: FakeClock) -> None:
+    server.set("exists_key", "value")
 
     # Key exists
-    assert client.execute("EXISTS", "exists_key") == 1
+    assert server.exists("exists_key") == 1
 
     # Set TTL
-    assert client.execute("EXPIRE", "exists_key", 1) == 1
+    assert server.expire("exists_key", 1) == 1
 
     # Still exists
-    assert client.execute("EXISTS", "exists_key") == 1
+    assert server.exists("exists_key") == 1
 
-    # Wait for expiration
-    time.sleep(1.1)
+    # Move past expiration
+    clock.advance(1100)
 
     # No longer exists
-    assert client.execute("EXISTS", "exists_key") == 0
+    assert server.exists("exists_key") == 0
 
 
-def test_keys_with_ttl(client: Client) -> None:
-    client.set("key1", "value1")
-    client.set("key2", "value2")
-    client.set("key3", "value3")
+def test_keys_with_ttl(server: Server, clock: FakeClock) -> None:
+    server.set("key1", "value1")
+    server.set("key2", "value2")
+    server.set("key3", "value3")
 
     # All keys exist
-    keys = client.execute("KEYS", "*")
+    keys = server.keys("*")
     assert len(keys) == 3
     assert "key1" in keys
     assert "key2" in keys
     assert "key3" in keys
 
     # Set TTL on one key
-    assert client.execute("EXPIRE", "key2", 1) == 1
+    assert server.expire("key2", 1) == 1
 
     # All keys still exist
-    keys = client.execute("KEYS", "*")
+    keys = server.keys("*")
     assert len(keys) == 3
 
-    # Wait for expiration
-    time.sleep(1.1)
+    # Move past expiration
+    clock.advance(1100)
 
     # Only 2 keys remain
-    keys = client.execute("KEYS", "*")
+    keys = server.keys("*")
     assert len(keys) == 2
     assert "key1" in keys
     assert "key3" in keys
@@ -257,3 +284,18 @@ def test_pttl_edge_cases(client: Client) -> None:
     assert client.execute("PEXPIRE", "pttl_key", -1) == 0
     assert client.get("pttl_key") == "value"
     assert client.execute("PTTL", "pttl_key") == -1
+
+
+def test_mset_clears_overflow_ttls(server: Server) -> None:
+    server.set("mset_key", "value")
+
+    # TTLs past the wheel's reach wait in the overflow heap; MSET clearing
+    # them has to let the heap compact rather than grow with every round
+    for _ in range(20_000):
+        assert server.expire("mset_key", 1000) == 1
+        assert server.mset("mset_key", "value") == 1
+
+    ttl_manager = server._ttl_manager
+    assert server.ttl("mset_key") == -1
+    assert not ttl_manager.key_expiry
+    assert len(ttl_manager.overflow_heap) <= 2 * OVERFLOW_COMPACT_MIN